@@ -4,11 +4,15 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
+import queue
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import os
-import datetime
+
+# La logica (backend) esta en ku_logic.py
+from ku_logic import (UniversityLogic, ResultCache, StageMetrics, SQLiteStore, Progress, read_log_page,
+                      LOG_FILE, GPA_TABLE, STATS_TABLE)
 
 # --- CONFIGURACION DE COLORES (Tema Oscuro) ---
 BG_COLOR = "#1e1e1e"        # Fondo principal (Negro suave)
@@ -20,212 +24,283 @@ RED_COLOR = "#f48771"       # Error
 TEXT_WHITE = "#ffffff"
 TEXT_GREY = "#cccccc"
 
-# --- LOGICA DEL PROGRAMA (BACKEND) ---
-# Esta clase maneja todos los datos y calculos
-class UniversityLogic:
-    def __init__(self):
-        # Dataframes vacios al inicio para evitar errores
-        self.clean_data = pd.DataFrame()
-        self.gpa_data = pd.DataFrame()
-        self.course_stats = pd.DataFrame()
-        self.logs = []
-
-    def add_log(self, message):
-        # Funcion para guardar logs con la hora exacta
-        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        entry = f"[{now}] {message}"
-        print(entry) # Imprimir en consola tambien por si acaso
-        self.logs.append(entry)
-
-    def load_file(self, filepath):
-        self.logs = [] # Limpiar logs de la corrida anterior
-        self.add_log(f"Starting process for: {filepath}")
-        
-        try:
-            # Detectar formato (CSV o JSON)
-            if filepath.endswith('.csv'):
-                df = pd.read_csv(filepath)
-            elif filepath.endswith('.json'):
-                df = pd.read_json(filepath)
-            else:
-                self.add_log("Error: File format not supported (Only .csv or .json)")
-                return False
-
-            # --- LIMPIEZA DE COLUMNAS (Manual) ---
-            # Pasamos todo a minusculas y quitamos espacios para evitar problemas
-            df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-
-            # Arreglamos nombres de columnas manualmente (Requisito del compañero)
-            # A veces el archivo trae 'academic_term' y a veces 'period'
-            if 'academic_term' in df.columns:
-                df = df.rename(columns={'academic_term': 'term'})
-            elif 'period' in df.columns:
-                df = df.rename(columns={'period': 'term'})
-            
-            if 'student_no' in df.columns:
-                df = df.rename(columns={'student_no': 'student_id'})
-            elif 'id' in df.columns:
-                df = df.rename(columns={'id': 'student_id'})
-
-            if 'course_code' in df.columns:
-                df = df.rename(columns={'course_code': 'course_id'})
-
-            if 'full_name' in df.columns:
-                df = df.rename(columns={'full_name': 'student_name'})
-            elif 'name' in df.columns:
-                df = df.rename(columns={'name': 'student_name'})
-
-            # Verificar columnas obligatorias
-            required = ['student_id', 'term', 'credits', 'grade']
-            missing = []
-            for col in required:
-                if col not in df.columns:
-                    missing.append(col)
-            
-            if len(missing) > 0:
-                self.add_log(f"CRITICAL ERROR: Missing columns {missing}")
-                return False
-
-            # --- VALIDACION FILA POR FILA ---
-            good_rows = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Validar creditos (debe ser numero entre 1 y 5)
-                    c = float(row['credits'])
-                    if c < 1 or c > 5:
-                        raise ValueError(f"Credits out of range: {c}")
-
-                    # Validar notas (Solo A, B, C, D, F)
-                    # Cualquier otra letra como 'E' se considera error
-                    g = str(row['grade']).upper().strip()
-                    if g not in ['A', 'B', 'C', 'D', 'F']:
-                        raise ValueError(f"Invalid grade: {g}")
-
-                    # Si pasa las pruebas, la guardamos
-                    good_rows.append(row)
-
-                except Exception as e:
-                    # Si falla, la saltamos y guardamos por qué en el log
-                    self.add_log(f"Skipping Row {index}: {e}")
-
-            # Creamos el dataframe limpio con solo las filas buenas
-            self.clean_data = pd.DataFrame(good_rows)
-
-            # Escribir el log en un archivo fisico (KU_academic_run.log)
-            try:
-                f = open("KU_academic_run.log", "w")
-                for line in self.logs:
-                    f.write(line + "\n")
-                f.close()
-            except:
-                print("Could not save log file")
-
-            if self.clean_data.empty:
-                self.add_log("Warning: No valid data found after cleaning.")
-                return False
-
-            # Si todo sale bien, calculamos los reportes
-            self.calculate_gpa()
-            self.calculate_stats()
-            return True
+# Alto (en pixeles) de cada fila y del encabezado de las tablas
+ROW_HEIGHT = 22
+HEADING_HEIGHT = 26
 
-        except Exception as e:
-            self.add_log(f"Critical System Error: {e}")
-            return False
+# Lineas del log que se muestran por pagina en la pantalla de logs
+LOG_PAGE_LINES = 1000
 
-    def calculate_gpa(self):
-        # Tabla de puntos
-        points = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
-        
-        data = self.clean_data.copy()
-        data['points'] = data['grade'].str.upper().map(points)
-        data['credits'] = data['credits'].astype(float)
-        
-        data['quality_points'] = data['points'] * data['credits']
-        
-        # Agrupar datos (usamos try para ser flexibles con columnas opcionales)
-        cols_to_group = ['student_id', 'term']
-        if 'student_name' in data.columns: cols_to_group.append('student_name')
-        if 'major' in data.columns: cols_to_group.append('major')
-        if 'campus' in data.columns: cols_to_group.append('campus')
+# Medir memoria por etapa usa tracemalloc, que hace la carga varias veces mas lenta
+TRACK_MEMORY = False
 
-        grouped = data.groupby(cols_to_group)
-        
-        results = []
-        for ids, group in grouped:
-            total_qp = group['quality_points'].sum()
-            total_cr = group['credits'].sum()
-            
-            final_gpa = total_qp / total_cr if total_cr > 0 else 0.0
-            
-            # Crear diccionario para la fila
-            row_dict = {}
-            for i in range(len(cols_to_group)):
-                col_name = cols_to_group[i]
-                val = ids[i]
-                row_dict[col_name] = val
-            
-            row_dict['GPA'] = round(final_gpa, 2)
-            results.append(row_dict)
-
-        self.gpa_data = pd.DataFrame(results)
-        self.gpa_data.to_csv("KU_academic_master_gpa.csv", index=False)
-
-    def calculate_stats(self):
-        # Estadisticas por curso
-        points = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
-        
-        cols = ['course_id']
-        if 'course_name' in self.clean_data.columns: cols.append('course_name')
-        if 'department' in self.clean_data.columns: cols.append('department')
+# Guardar los datos en SQLite (KU_academic.db) en vez de tenerlos en memoria,
+# para historias muy grandes. Las tablas leen de la base pagina por pagina
+USE_SQLITE = False
 
-        grouped = self.clean_data.groupby(cols)
-        
-        stats_list = []
-        for ids, group in grouped:
-            count = len(group)
-            
-            # Promedio numerico
-            nums = group['grade'].str.upper().map(points)
-            avg = nums.mean()
-            
-            # Convertir promedio a letra
-            if avg >= 3.5: letter = 'A'
-            elif avg >= 2.5: letter = 'B'
-            elif avg >= 1.5: letter = 'C'
-            elif avg >= 0.5: letter = 'D'
-            else: letter = 'F'
-            
-            # Pass rate (D o mejor aprueba)
-            passed = group[group['grade'].str.upper().isin(['A','B','C','D'])]
-            pass_rate = len(passed) / count
-            
-            grades = sorted(group['grade'].unique())
-            high = grades[0] 
-            low = grades[-1]
-
-            row_dict = {}
-            if len(cols) == 1:
-                row_dict[cols[0]] = ids
-            else:
-                for i in range(len(cols)):
-                    row_dict[cols[i]] = ids[i]
-            
-            row_dict['enrollment_count'] = count
-            row_dict['avg_grade'] = letter
-            row_dict['pass_rate'] = round(pass_rate, 2)
-            row_dict['highest_grade'] = high
-            row_dict['lowest_grade'] = low
-            
-            stats_list.append(row_dict)
-            
-        self.course_stats = pd.DataFrame(stats_list)
-        self.course_stats.to_csv("KU_academic_stats_by_course.csv", index=False)
+# Formatos en que se guardan los reportes: 'csv', 'csv.gz' y/o 'parquet'
+REPORT_FORMATS = ('csv',)
 
+# Cada cuantos milisegundos la ventana revisa los avisos del proceso en segundo plano
+POLL_MS = 100
+
+# Nombre que se muestra para cada etapa en la barra de estado
+STAGE_NAMES = {
+    'parse': "Reading", 'validate': "Validating", 'parse_files': "Reading files",
+    'merge': "Merging", 'reports': "Calculating reports",
+}
 
 # --- INTERFAZ GRAFICA (GUI) ---
 
+class DataTable(tk.Frame):
+    """
+    Tabla virtual para DataFrames grandes.
+    Solo crea las filas que caben en pantalla y les cambia los valores al hacer
+    scroll. El orden y el filtro se calculan sobre el DataFrame, no sobre el widget.
+    Con store (un SQLiteStore) y table, el orden y el filtro los hace la base y
+    solo se leen las filas de la pagina.
+    """
+    BUFFER = 100  # Filas extra que se guardan arriba y abajo de lo visible
+
+    def __init__(self, master, data, columns, store=None, table=None):
+        """Crea la tabla, el cuadro de filtro y la barra de scroll."""
+        super().__init__(master, bg=BG_COLOR)
+        self.data = data
+        self.store = store
+        self.table = table
+        if data.empty:
+            self.columns = list(columns)
+        else:
+            self.columns = [c for c in columns if c in data.columns]
+        if store is not None:
+            # La vista son los rowid de la tabla, en el orden en que se muestran
+            self.view = store.row_ids(table, self.columns)
+        else:
+            self.view = data.reindex(columns=self.columns)
+        self.text_cache = {}
+        self.sort_col = None
+        self.sort_asc = True
+        self.offset = 0
+        self.page = 1
+        self.rows_start = 0
+        self.rows = []
+        self.filter_job = None
+
+        # Cuadro de filtro + contador de filas
+        top = tk.Frame(self, bg=BG_COLOR)
+        top.pack(fill="x", pady=(0, 5))
+        tk.Label(top, text="Filter:", bg=BG_COLOR, fg=TEXT_GREY).pack(side="left")
+        self.filter_var = tk.StringVar()
+        entry = tk.Entry(top, textvariable=self.filter_var, bg=TABLE_BG, fg=TEXT_WHITE,
+                         insertbackground=TEXT_WHITE)
+        entry.pack(side="left", padx=5)
+        entry.bind("<KeyRelease>", self.schedule_filter)
+        self.count_label = tk.Label(top, text="", bg=BG_COLOR, fg=TEXT_GREY)
+        self.count_label.pack(side="right")
+
+        # La barra de scroll la manejamos nosotros (el Treeview solo tiene una pagina)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings")
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=100)
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_rows(-self.page))
+        self.tree.bind("<Next>", lambda e: self.scroll_rows(self.page))
+        self.render()
+
+    # --- DATOS (DataFrame) ---
+
+    def text_column(self, col):
+        """Devuelve la columna en minusculas como texto (se calcula una sola vez)."""
+        if col not in self.text_cache:
+            self.text_cache[col] = self.data[col].astype(str).str.lower()
+        return self.text_cache[col]
+
+    def apply_filter(self):
+        """Filtra las filas que contienen el texto en cualquier columna."""
+        self.filter_job = None
+        if self.store is not None:
+            self.apply_sort()
+            self.offset = 0
+            self.refresh()
+            return
+        text = self.filter_var.get().strip().lower()
+        view = self.data.reindex(columns=self.columns)
+        if text and not view.empty:
+            mask = pd.Series(False, index=view.index)
+            for col in self.columns:
+                mask |= self.text_column(col).str.contains(text, regex=False, na=False)
+            view = view[mask]
+        self.view = view
+        self.apply_sort()
+        self.offset = 0
+        self.refresh()
+
+    def apply_sort(self):
+        """Ordena la vista actual por la columna elegida."""
+        if self.store is not None:
+            # La base filtra y ordena de una vez
+            text = self.filter_var.get().strip()
+            self.view = self.store.row_ids(self.table, self.columns, text, self.sort_col, self.sort_asc)
+            return
+        if self.sort_col is None or self.view.empty:
+            return
+        try:
+            self.view = self.view.sort_values(self.sort_col, ascending=self.sort_asc, kind="stable")
+        except TypeError:
+            # Columnas con tipos mezclados se ordenan como texto
+            self.view = self.view.sort_values(self.sort_col, ascending=self.sort_asc, kind="stable",
+                                              key=lambda s: s.astype(str))
+
+    def get_rows(self, start, end):
+        """Devuelve las filas [start, end) usando el buffer si ya estan cargadas."""
+        rows_end = self.rows_start + len(self.rows)
+        if start < self.rows_start or end > rows_end:
+            self.rows_start = max(0, start - self.BUFFER)
+            if self.store is not None:
+                ids = self.view[self.rows_start:end + self.BUFFER]
+                self.rows = self.store.rows_by_id(self.table, self.columns, ids)
+            else:
+                chunk = self.view.iloc[self.rows_start:end + self.BUFFER]
+                self.rows = list(chunk.itertuples(index=False, name=None))
+        return self.rows[start - self.rows_start:end - self.rows_start]
+
+    # --- WIDGET ---
+
+    def refresh(self):
+        """Vuelve a leer los datos desde cero (despues de ordenar o filtrar)."""
+        self.rows_start = 0
+        self.rows = []
+        self.render()
+
+    def render(self):
+        """Muestra en el Treeview solo las filas de la pagina actual."""
+        total = len(self.view)
+        self.offset = max(0, min(self.offset, total - self.page))
+        end = min(self.offset + self.page, total)
+        rows = self.get_rows(self.offset, end)
+
+        # Reusamos los items que ya existen, solo cambiamos sus valores
+        items = list(self.tree.get_children())
+        while len(items) < len(rows):
+            items.append(self.tree.insert("", "end"))
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+        for iid, vals in zip(items, rows):
+            self.tree.item(iid, values=vals)
+
+        if total:
+            self.scrollbar.set(self.offset / total, end / total)
+            self.count_label.config(text=f"Rows {self.offset + 1}-{end} of {total}")
+        else:
+            self.scrollbar.set(0, 1)
+            self.count_label.config(text="No rows")
+
+    def schedule_filter(self, event=None):
+        """Espera a que el usuario deje de escribir antes de filtrar."""
+        if self.filter_job is not None:
+            self.after_cancel(self.filter_job)
+        self.filter_job = self.after(300, self.apply_filter)
+
+    def sort_by(self, col):
+        """Ordena por la columna del encabezado (click otra vez = al reves)."""
+        if self.sort_col == col:
+            self.sort_asc = not self.sort_asc
+        else:
+            self.sort_col, self.sort_asc = col, True
+        for c in self.columns:
+            arrow = (" \u25b2" if self.sort_asc else " \u25bc") if c == col else ""
+            self.tree.heading(c, text=c + arrow)
+        self.apply_sort()
+        self.refresh()
+
+    def scroll_rows(self, n):
+        self.offset += n
+        self.render()
+
+    def on_wheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def on_scrollbar(self, *args):
+        """Maneja la barra de scroll ('moveto' o 'scroll')."""
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.view))
+            self.render()
+        elif args[0] == "scroll":
+            step = self.page if args[2] == "pages" else 1
+            self.scroll_rows(int(args[1]) * step)
+
+    def on_resize(self, event):
+        """Calcula cuantas filas caben cuando cambia el tamaño de la tabla."""
+        page = max(1, (event.height - HEADING_HEIGHT) // ROW_HEIGHT)
+        if page != self.page:
+            self.page = page
+            self.render()
+
+class JobRunner:
+    """
+    Corre una tarea larga en un hilo sin congelar la ventana.
+    El hilo nunca toca los widgets: manda cada aviso a una cola y la ventana
+    los lee con after() cada POLL_MS. Solo corre una tarea a la vez.
+    """
+    def __init__(self, widget, on_event):
+        """on_event(evento) se llama en el hilo de Tk por cada aviso."""
+        self.widget = widget
+        self.on_event = on_event
+        self.events = queue.Queue()
+        self.thread = None
+        self.progress = None
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def start(self, task):
+        """Empieza task(progress) en otro hilo. Devuelve False si ya hay una corriendo."""
+        if self.running:
+            return False
+        self.progress = Progress(self.events.put)
+        self.thread = threading.Thread(target=self.run, args=(task, self.progress), daemon=True)
+        self.thread.start()
+        self.widget.after(POLL_MS, self.poll)
+        return True
+
+    def run(self, task, progress):
+        """Corre en el hilo: el resultado también va por la cola."""
+        try:
+            ok = bool(task(progress))
+            self.events.put({'stage': 'done', 'ok': ok, 'cancelled': not ok and progress.cancelled.is_set()})
+        except Exception as e:
+            self.events.put({'stage': 'done', 'ok': False, 'cancelled': False, 'error': str(e)})
+
+    def cancel(self):
+        """Pide parar; el proceso se detiene en la próxima etapa o bloque."""
+        if self.progress is not None:
+            self.progress.cancel()
+
+    def poll(self):
+        """Pasa a la ventana los avisos que dejó el hilo en la cola."""
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event['stage'] == 'done':
+                self.thread = None
+                self.progress = None
+            self.on_event(event)
+            if event['stage'] == 'done':
+                return
+        self.widget.after(POLL_MS, self.poll)
+
+
 class App(tk.Tk):
     """
     Gestiona la interfaz gráfica principal de la aplicación.
@@ -238,7 +313,17 @@ class App(tk.Tk):
         self.geometry("1100x700")
         self.configure(bg=BG_COLOR) # Fondo principal oscuro
         
-        self.logic = UniversityLogic()
+        self.logic = UniversityLogic(cache=ResultCache(), metrics=StageMetrics(memory=TRACK_MEMORY),
+                                     store=SQLiteStore() if USE_SQLITE else None,
+                                     export_formats=REPORT_FORMATS)
+
+        # Carga y merge corren en segundo plano, de a una por vez
+        self.jobs = JobRunner(self, self.on_job_event)
+        self.status = ("Waiting for file...", "yellow")
+        self.job_name = None
+
+        # La figura de los graficos se crea una vez y se reusa (ver setup_chart_canvas)
+        self.chart_frame = None
         
         # Configurar estilos de tablas (Para que se vean oscuras)
         self.setup_styles()
@@ -261,7 +346,8 @@ class App(tk.Tk):
                         background=TABLE_BG, 
                         foreground=TEXT_WHITE, 
                         fieldbackground=TABLE_BG, 
-                        borderwidth=0)
+                        borderwidth=0,
+                        rowheight=ROW_HEIGHT)
         
         # Encabezados de la tabla
         style.configure("Treeview.Heading", 
@@ -299,6 +385,10 @@ class App(tk.Tk):
                                    bd=0, command=self.show_stats, anchor="w", padx=20)
         self.btn_stats.pack(fill="x", pady=5)
 
+        self.btn_students = tk.Button(self.sidebar, text="Student Search", bg=SIDEBAR_COLOR, fg="white",
+                                      bd=0, command=self.show_students, anchor="w", padx=20)
+        self.btn_students.pack(fill="x", pady=5)
+
         self.btn_charts = tk.Button(self.sidebar, text="Charts", bg=SIDEBAR_COLOR, fg="white", 
                                     bd=0, command=self.show_charts, anchor="w", padx=20)
         self.btn_charts.pack(fill="x", pady=5)
@@ -316,7 +406,10 @@ class App(tk.Tk):
     def clear_main_area(self):
         """Elimina todos los widgets presentes en el área principal."""
         for widget in self.main_frame.winfo_children():
-            widget.destroy()
+            if widget is self.chart_frame:
+                widget.pack_forget()  # El area de graficos se guarda para reusarla
+            else:
+                widget.destroy()
 
     # --- PANTALLAS ---
 
@@ -333,13 +426,23 @@ class App(tk.Tk):
                         font=("Arial", 12), bg=BG_COLOR, fg=TEXT_GREY)
         lbl2.pack(pady=10)
 
-        btn = tk.Button(self.main_frame, text="UPLOAD FILE", bg=BLUE_COLOR, fg="white", 
-                        font=("Arial", 12, "bold"), padx=20, pady=10, command=self.upload_file)
-        btn.pack(pady=30)
+        self.btn_upload = tk.Button(self.main_frame, text="UPLOAD FILE", bg=BLUE_COLOR, fg="white", 
+                                    font=("Arial", 12, "bold"), padx=20, pady=10, command=self.upload_file)
+        self.btn_upload.pack(pady=(30, 10))
 
-        self.status_label = tk.Label(self.main_frame, text="Waiting for file...", bg=BG_COLOR, fg="yellow")
+        self.btn_merge = tk.Button(self.main_frame, text="MERGE FILES", bg=SIDEBAR_COLOR, fg="white",
+                                   font=("Arial", 10, "bold"), padx=15, pady=5, command=self.merge_files)
+        self.btn_merge.pack(pady=(0, 20))
+
+        text, color = self.status
+        self.status_label = tk.Label(self.main_frame, text=text, bg=BG_COLOR, fg=color)
         self.status_label.pack(pady=20)
 
+        self.btn_cancel = tk.Button(self.main_frame, text="CANCEL", bg=RED_COLOR, fg="white",
+                                    font=("Arial", 10, "bold"), padx=15, pady=5, command=self.cancel_job)
+        self.btn_cancel.pack()
+        self.update_job_buttons()
+
     def show_gpa(self):
         """Muestra la vista del reporte de GPA en una tabla."""
         self.clear_main_area()
@@ -348,19 +451,10 @@ class App(tk.Tk):
         lbl.pack(anchor="w", pady=10)
 
         # La tabla usara los colores oscuros configurados en setup_styles
+        # Solo se crean las filas visibles, asi no se congela con muchos datos
         cols = ("student_id", "student_name", "major", "term", "GPA")
-        tree = ttk.Treeview(self.main_frame, columns=cols, show="headings")
-        
-        for col in cols:
-            tree.heading(col, text=col)
-            tree.column(col, width=100)
-        
-        tree.pack(fill="both", expand=True)
-
-        if not self.logic.gpa_data.empty:
-            for index, row in self.logic.gpa_data.iterrows():
-                vals = list(row)
-                tree.insert("", "end", values=vals)
+        table = DataTable(self.main_frame, self.logic.gpa_data, cols, self.logic.store, GPA_TABLE)
+        table.pack(fill="both", expand=True)
 
     def show_stats(self):
         """Muestra la vista de estadísticas de cursos en una tabla."""
@@ -370,18 +464,75 @@ class App(tk.Tk):
         lbl.pack(anchor="w", pady=10)
 
         cols = ("course_id", "course_name", "enrollment_count", "pass_rate", "avg_grade")
-        tree = ttk.Treeview(self.main_frame, columns=cols, show="headings")
-        
-        for col in cols:
-            tree.heading(col, text=col)
-            tree.column(col, width=100)
-        
-        tree.pack(fill="both", expand=True)
+        table = DataTable(self.main_frame, self.logic.course_stats, cols, self.logic.store, STATS_TABLE)
+        table.pack(fill="both", expand=True)
+
+    def show_students(self):
+        """Muestra la búsqueda de estudiantes y la historia de GPA del elegido."""
+        self.clear_main_area()
+        lbl = tk.Label(self.main_frame, text="Student Search", font=("Arial", 18, "bold"),
+                       bg=BG_COLOR, fg="white")
+        lbl.pack(anchor="w", pady=10)
 
-        if not self.logic.course_stats.empty:
-            for index, row in self.logic.course_stats.iterrows():
-                vals = [row[c] for c in cols if c in row]
-                tree.insert("", "end", values=vals)
+        top = tk.Frame(self.main_frame, bg=BG_COLOR)
+        top.pack(fill="x", pady=(0, 5))
+        tk.Label(top, text="ID or name:", bg=BG_COLOR, fg=TEXT_GREY).pack(side="left")
+        self.student_var = tk.StringVar()
+        entry = tk.Entry(top, textvariable=self.student_var, bg=TABLE_BG, fg=TEXT_WHITE,
+                         insertbackground=TEXT_WHITE)
+        entry.pack(side="left", padx=5)
+        entry.bind("<KeyRelease>", self.schedule_student_search)
+        self.student_job = None
+
+        # Arriba los estudiantes encontrados, abajo la historia del seleccionado
+        self.student_matches = ttk.Treeview(self.main_frame, columns=("student_id", "student_name"),
+                                            show="headings", height=8)
+        for col in ("student_id", "student_name"):
+            self.student_matches.heading(col, text=col)
+        self.student_matches.pack(fill="x")
+        self.student_matches.bind("<<TreeviewSelect>>", self.show_student_history)
+
+        cols = ("term", "credits", "GPA", "cumulative_GPA", "GPA_change")
+        self.student_history = ttk.Treeview(self.main_frame, columns=cols, show="headings")
+        for col in cols:
+            self.student_history.heading(col, text=col)
+            self.student_history.column(col, width=100)
+        self.student_history.pack(fill="both", expand=True, pady=(10, 0))
+
+        if self.logic.students is None:
+            self.student_matches.insert("", "end", values=("", "Load a file first"))
+        entry.focus_set()
+
+    def schedule_student_search(self, event=None):
+        """Espera a que el usuario deje de escribir antes de buscar."""
+        if self.student_job is not None:
+            self.after_cancel(self.student_job)
+        self.student_job = self.after(200, self.search_students)
+
+    def search_students(self):
+        """Busca por id exacto o por el comienzo del nombre (búsqueda binaria)."""
+        self.student_job = None
+        if self.logic.students is None:
+            return
+        found = self.logic.students.search(self.student_var.get())
+        self.student_matches.delete(*self.student_matches.get_children())
+        self.student_history.delete(*self.student_history.get_children())
+        for row in found.itertuples(index=False):
+            name = "" if pd.isna(row.student_name) else row.student_name
+            self.student_matches.insert("", "end", values=(row.student_id, name))
+
+    def show_student_history(self, event=None):
+        """Muestra los periodos del estudiante seleccionado con su GPA acumulado."""
+        selected = self.student_matches.selection()
+        if not selected or self.logic.students is None:
+            return
+        text = self.student_matches.item(selected[0], "values")[0]
+        history = self.logic.students.lookup(self.logic.students.parse_id(text))
+        self.student_history.delete(*self.student_history.get_children())
+        for row in history.itertuples(index=False):
+            change = "" if pd.isna(row.GPA_change) else f"{row.GPA_change:+.2f}"
+            self.student_history.insert("", "end", values=(row.term, row.credits, f"{row.GPA:.2f}",
+                                                           f"{row.cumulative_GPA:.2f}", change))
 
     def show_charts(self):
         """Muestra la vista de gráficos y botones de selección."""
@@ -400,9 +551,32 @@ class App(tk.Tk):
         b3 = tk.Button(frame_btns, text="Pass Rate", command=lambda: self.plot(3))
         b3.pack(side="left", padx=5)
 
-        self.chart_frame = tk.Frame(self.main_frame, bg=BG_COLOR)
+        if self.chart_frame is None:
+            self.setup_chart_canvas()
         self.chart_frame.pack(fill="both", expand=True, pady=20)
 
+    def setup_chart_canvas(self):
+        """Crea una sola vez la figura y el canvas que usan todos los gráficos."""
+        self.chart_frame = tk.Frame(self.main_frame, bg=BG_COLOR)
+        self.figure = plt.Figure(figsize=(6, 5), dpi=100)
+        self.figure.patch.set_facecolor(BG_COLOR)
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.chart_frame)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.clear_chart()
+
+    def clear_chart(self):
+        """Limpia los ejes y les vuelve a poner los colores oscuros."""
+        ax = self.ax
+        ax.clear()
+        ax.set_facecolor(BG_COLOR)
+        ax.tick_params(colors='white')
+        ax.xaxis.label.set_color('white')
+        ax.yaxis.label.set_color('white')
+        ax.title.set_color('white')
+        for spine in ax.spines.values():
+            spine.set_color('white')
+
     def show_logs(self):
         """Muestra la vista de registros de ejecución del sistema."""
         self.clear_main_area()
@@ -410,91 +584,166 @@ class App(tk.Tk):
                        bg=BG_COLOR, fg="white")
         lbl.pack(anchor="w", pady=10)
 
-        text_area = tk.Text(self.main_frame, bg="black", fg="#00ff00")
-        text_area.pack(fill="both", expand=True)
-        
-        for line in self.logic.logs:
-            text_area.insert("end", line + "\n")
-        text_area.config(state="disabled")
+        # Resumen de tiempos por etapa de la ultima corrida
+        summary = self.logic.metrics.summary_lines()
+        if summary:
+            tk.Label(self.main_frame, text="\n".join(summary), font=("Courier", 10), justify="left",
+                     bg=BG_COLOR, fg=TEXT_GREY).pack(anchor="w", pady=(0, 10))
+
+        # Botones para moverse por el archivo de log (se lee de a una pagina)
+        nav = tk.Frame(self.main_frame, bg=BG_COLOR)
+        nav.pack(fill="x", pady=(0, 5))
+        tk.Button(nav, text="First", command=lambda: self.show_log_page(0)).pack(side="left", padx=5)
+        tk.Button(nav, text="Previous", command=lambda: self.show_log_page(self.log_page - 1)).pack(side="left", padx=5)
+        tk.Button(nav, text="Next", command=lambda: self.show_log_page(self.log_page + 1)).pack(side="left", padx=5)
+        self.log_page_label = tk.Label(nav, text="", bg=BG_COLOR, fg=TEXT_GREY)
+        self.log_page_label.pack(side="left", padx=10)
+
+        self.log_text = tk.Text(self.main_frame, bg="black", fg="#00ff00")
+        self.log_text.pack(fill="both", expand=True)
+
+        # Offsets (en bytes) donde empieza cada pagina ya vista
+        self.log_offsets = [0]
+        self.log_page = 0
+        self.show_log_page(0)
+
+    def show_log_page(self, page):
+        """Muestra una página del archivo de log sin cargarlo completo."""
+        if page < 0 or page >= len(self.log_offsets):
+            return
+        try:
+            lines, next_offset = read_log_page(self.logic.output_path(LOG_FILE), self.log_offsets[page], LOG_PAGE_LINES)
+        except OSError:
+            # Todavia no hay archivo: mostramos lo que hay en memoria
+            lines, next_offset = self.logic.logs, None
+
+        self.log_page = page
+        if next_offset is not None and page + 1 == len(self.log_offsets):
+            self.log_offsets.append(next_offset)
+        more = "" if next_offset is None else " (more in Next)"
+        self.log_page_label.config(text=f"Page {page + 1}{more}")
+
+        self.log_text.config(state="normal")
+        self.log_text.delete("1.0", "end")
+        self.log_text.insert("end", "\n".join(lines) + "\n")
+        self.log_text.config(state="disabled")
 
     # --- FUNCIONES DE BOTONES ---
 
     def upload_file(self):
         """Abre un diálogo para seleccionar archivo e inicia el proceso en segundo plano."""
-        filename = filedialog.askopenfilename(filetypes=[("Data Files", "*.csv *.json")])
+        if self.jobs.running:
+            return
+        filename = filedialog.askopenfilename(filetypes=[("Data Files", "*.csv *.json *.jsonl *.ndjson")])
         if filename:
-            self.status_label.config(text="Processing... please wait")
-            self.update()
-            
-            # Usar hilos para no congelar la app
-            t = threading.Thread(target=self.run_process, args=(filename,))
-            t.start()
-
-    def run_process(self, filename):
-        """Ejecuta la lógica de carga y actualiza la interfaz según el resultado."""
-        result = self.logic.load_file(filename)
-        
-        if result:
-            self.status_label.config(text="Success! File processed.", fg=GREEN_COLOR)
-            messagebox.showinfo("Done", "Processing Complete!\nCheck tabs for results.")
+            self.start_job("Processing", lambda progress: self.run_process(filename, progress))
+
+    def run_process(self, filename, progress):
+        """Corre en el hilo de fondo: solo la lógica, nada de widgets."""
+        self.logic.progress = progress
+        return self.logic.load_file(filename)
+
+    def merge_files(self):
+        """Agrega uno o varios archivos a los datos ya cargados (modo merge)."""
+        if self.jobs.running:
+            return
+        filenames = filedialog.askopenfilenames(filetypes=[("Data Files", "*.csv *.json *.jsonl *.ndjson")])
+        if filenames:
+            self.start_job("Merging", lambda progress: self.run_merge(list(filenames), progress))
+
+    def run_merge(self, filenames, progress):
+        """Corre en el hilo de fondo: solo la lógica, nada de widgets."""
+        self.logic.progress = progress
+        return self.logic.merge_files(filenames)
+
+    def start_job(self, name, task):
+        """Empieza una carga o merge si no hay otra corriendo."""
+        if not self.jobs.start(task):
+            messagebox.showwarning("Busy", "A file is already being processed.")
+            return
+        self.job_name = name
+        self.set_status(f"{name}... please wait", "yellow")
+        self.update_job_buttons()
+
+    def cancel_job(self):
+        """Pide cancelar la corrida actual (para entre etapas o bloques)."""
+        if self.jobs.running:
+            self.jobs.cancel()
+            self.set_status("Cancelling...", "yellow")
+
+    def on_job_event(self, event):
+        """Recibe los avisos del proceso en el hilo de Tk y actualiza la pantalla."""
+        if event['stage'] != 'done':
+            if self.jobs.progress is not None and self.jobs.progress.cancelled.is_set():
+                return
+            stage = STAGE_NAMES.get(event['stage'], event['stage'])
+            self.set_status(f"{self.job_name}: {stage}... {event['rows_parsed']:,} rows read, "
+                            f"{event['rows_valid']:,} valid", "yellow")
+            return
+
+        self.update_job_buttons()
+        if event['ok']:
+            if self.job_name == "Merging":
+                self.set_status(f"Success! {len(self.logic.files)} files merged.", GREEN_COLOR)
+                messagebox.showinfo("Done", "Merge Complete!\nCheck tabs for results.")
+            else:
+                self.set_status("Success! File processed.", GREEN_COLOR)
+                messagebox.showinfo("Done", "Processing Complete!\nCheck tabs for results.")
+        elif event['cancelled']:
+            self.set_status("Cancelled.", TEXT_GREY)
         else:
-            self.status_label.config(text="Error. Check logs tab.", fg=RED_COLOR)
+            self.set_status("Error. Check logs tab.", RED_COLOR)
             messagebox.showerror("Error", "Something went wrong.\nCheck Logs.")
 
-    def plot(self, chart_id):
-        """Genera y renderiza el gráfico seleccionado en el área de gráficos."""
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
+    def set_status(self, text, color):
+        """Guarda el estado y lo muestra si el dashboard está abierto."""
+        self.status = (text, color)
+        if self.status_label.winfo_exists():
+            self.status_label.config(text=text, fg=color)
 
-        if self.logic.clean_data.empty:
+    def update_job_buttons(self):
+        """Mientras corre algo solo se puede cancelar."""
+        if not self.btn_cancel.winfo_exists():
             return
+        busy = self.jobs.running
+        self.btn_upload.config(state="disabled" if busy else "normal")
+        self.btn_merge.config(state="disabled" if busy else "normal")
+        self.btn_cancel.config(state="normal" if busy else "disabled")
 
-        fig = plt.Figure(figsize=(6, 5), dpi=100)
-        ax = fig.add_subplot(111)
-        
-        # Colores oscuros para el grafico
-        fig.patch.set_facecolor(BG_COLOR)
-        ax.set_facecolor(BG_COLOR)
-        ax.tick_params(colors='white')
-        ax.xaxis.label.set_color('white')
-        ax.yaxis.label.set_color('white')
-        ax.title.set_color('white')
-        for spine in ax.spines.values():
-            spine.set_color('white')
+    def plot(self, chart_id):
+        """Dibuja el gráfico seleccionado reusando la misma figura y canvas."""
+        # Los datos ya vienen calculados desde load_file (logic.charts)
+        self.clear_chart()
+        ax = self.ax
+        data = self.logic.charts.get(chart_id)
 
         try:
-            if chart_id == 1:
-                data = self.logic.course_stats.sort_values('enrollment_count', ascending=False).head(10)
-                ax.bar(data['course_name'], data['enrollment_count'], color=BLUE_COLOR)
+            if data is None:
+                pass  # No hay datos cargados (o falta la columna) -> grafico vacio
+
+            elif chart_id == 1:
+                names, counts = data
+                ax.bar(names, counts, color=BLUE_COLOR)
                 ax.set_title("Top 10 Courses by Enrollment")
                 plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
             elif chart_id == 2:
-                gpas = self.logic.gpa_data['GPA']
-                low = len(gpas[gpas < 3.0])
-                mid = len(gpas[(gpas >= 3.0) & (gpas < 3.5)])
-                high = len(gpas[(gpas >= 3.5) & (gpas < 4.0)])
-                perfect = len(gpas[gpas == 4.0])
-                
-                counts = [low, mid, high, perfect]
-                labels = ['< 3.0', '3.0 - 3.49', '3.5 - 3.99', '4.0']
-                
+                labels, counts = data
                 # 'textprops' cambia el color de los numeros a blanco
                 ax.pie(counts, labels=labels, autopct='%1.1f%%', textprops={'color':"white"})
                 ax.set_title("GPA Distribution")
 
             elif chart_id == 3:
-                data = self.logic.course_stats.groupby('department')['pass_rate'].mean()
-                ax.barh(data.index, data.values, color=GREEN_COLOR)
+                departments, rates = data
+                ax.barh(departments, rates, color=GREEN_COLOR)
                 ax.set_title("Pass Rate by Department")
 
-            canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill="both", expand=True)
-
         except Exception as e:
             print("Error graphing:", e)
 
+        # Solo se redibuja, no se crea otra figura
+        self.canvas.draw_idle()
+
 if __name__ == "__main__":
     app = App()
     app.mainloop()
@@ -0,0 +1,257 @@
+# Copyright 2025 Roberto Canija
+# License: GPL-3.0-or-later
+
+# Modo sin interfaz (para las corridas de cada noche):
+#
+#   python ku_batch.py exports/ --workers 4
+#   python ku_batch.py "exports/*_2025SP.csv" exports/extra.json --output-dir reports
+#   python ku_batch.py exports/2025SP.csv exports/2025SP_fix.csv --merge latest
+#
+# Cada archivo se procesa en un proceso aparte. Al final se juntan los
+# resultados y se escriben los tres KU_academic_* una sola vez.
+# Con --merge las inscripciones repetidas (student_id, term, course_id)
+# quedan una sola vez, gana el archivo que va despues ('latest') o antes ('first').
+# Con --state la historia queda guardada en una carpeta: la noche siguiente
+# solo se pasan los archivos nuevos y se recalculan los estudiantes y cursos
+# que cambiaron:
+#
+#   python ku_batch.py exports/2025SP_week3.csv --state history/
+# Con --export-format los reportes salen tambien comprimidos o en Parquet:
+#
+#   python ku_batch.py exports/ --export-format csv.gz parquet
+#
+# Los archivos se escriben completos a un temporal y se cambian de nombre al
+# final, y no se reescriben si el contenido no cambio.
+# No importa tkinter ni matplotlib, asi arranca rapido.
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from ku_logic import (UniversityLogic, StageMetrics, merge_parts, gpa_report, stats_report,
+                      GPA_MERGE, COURSE_MERGE, GPA_FILE, STATS_FILE, LOG_FILE, METRICS_FILE,
+                      SUPPORTED_EXTENSIONS, MERGE_POLICIES, EXPORT_FORMATS, ReportExporter,
+                      export_log_lines, write_atomic)
+
+def find_inputs(patterns):
+    # Acepta carpetas, globs o archivos sueltos (sin repetir archivos)
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            matches = glob.glob(pattern)
+        files += sorted(m for m in matches if m.endswith(SUPPORTED_EXTENSIONS) and os.path.isfile(m))
+    return list(dict.fromkeys(files))
+
+def part_log(output_dir, n):
+    # Log de un archivo (o del merge); write_log los junta en KU_academic_run.log
+    return os.path.join(output_dir, f".{LOG_FILE}.{n}.part")
+
+def process_file(filepath, chunksize=None, metrics=False, memory=False, budget_mb=None, log_file=None):
+    # Corre dentro del pool: carga y valida un archivo sin escribir salidas.
+    # El log completo (con cada fila saltada) queda en log_file
+    logic = UniversityLogic(write_outputs=False, metrics=StageMetrics(enabled=metrics, memory=memory),
+                            memory_budget_mb=budget_mb, log_file=log_file, interactive=False)
+    start = time.perf_counter()
+    ok = logic.load_file(filepath, chunksize)
+    result = {
+        'file': filepath,
+        'ok': ok,
+        'logs': logic.logs,
+        'log_file': log_file,
+        'gpa_parts': logic.gpa_parts if ok else None,
+        'course_parts': logic.course_parts if ok else None,
+        'seconds': round(time.perf_counter() - start, 4),
+        'stages': logic.metrics.report(),
+    }
+    # Aqui no se usan los datos limpios, asi que no dejamos nada en disco
+    logic.drop_spill()
+    return result
+
+def combine_parts(parts, how):
+    # Junta los resultados parciales de todos los archivos. Si un archivo trae
+    # columnas opcionales que otro no tiene (ej. 'major'), se agrupa solo por
+    # las columnas que tienen todos
+    levels = [n for n in parts[0].index.names if all(n in p.index.names for p in parts)]
+    merged = None
+    for part in parts:
+        if list(part.index.names) != levels:
+            part = part.groupby(level=levels).agg(how)
+        merged = merge_parts(merged, part, how)
+    return merged
+
+def run_batch(files, workers=None, chunksize=None, metrics=False, memory=False, budget_mb=None,
+              output_dir=None):
+    # Devuelve los resultados de cada archivo en el mismo orden de 'files'.
+    # Con output_dir cada archivo deja su log completo ahi (ver part_log)
+    n = len(files)
+    logs = [part_log(output_dir, i) if output_dir is not None else None for i in range(n)]
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    if workers == 1 or n == 1:
+        return [process_file(f, chunksize, metrics, memory, budget_mb, log) for f, log in zip(files, logs)]
+    workers = min(workers or os.cpu_count() or 1, n)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(process_file, files, [chunksize] * n, [metrics] * n, [memory] * n,
+                              [budget_mb] * n, logs))
+
+def stamp(message):
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return f"[{now}] {message}"
+
+def write_log(path, lines, parts=()):
+    # Primero los logs de cada archivo (se copian sin cargarlos en memoria),
+    # despues 'lines'. Los logs de cada archivo se borran al final
+    def write(tmp):
+        with open(tmp, "w") as f:
+            for part in parts:
+                with open(part) as src:
+                    shutil.copyfileobj(src, f)
+            f.writelines(line + "\n" for line in lines)
+    write_atomic(path, write)
+    for part in parts:
+        os.remove(part)
+
+def run_logs(results):
+    # (lineas que no estan en un archivo, archivos de log) de cada resultado
+    lines, parts = [], []
+    for r in results:
+        if r.get('log_file') and os.path.exists(r['log_file']):
+            parts.append(r['log_file'])
+        else:
+            lines += r['logs']
+    return lines, parts
+
+def finish_exports(exporter, logs):
+    # Espera los reportes que se estan escribiendo y agrega al log lo que paso
+    for result in exporter.wait():
+        logs += [stamp(line) for line in export_log_lines(result)]
+
+def write_outputs(results, output_dir, metrics=None, formats=('csv',)):
+    # Escribe los tres KU_academic_* con todos los archivos juntos
+    metrics = metrics if metrics is not None else StageMetrics(enabled=False)
+    os.makedirs(output_dir, exist_ok=True)
+    good = [r for r in results if r['ok']]
+
+    logs, parts = run_logs(results)
+
+    gpa_data = course_stats = None
+    if good:
+        # El reporte de GPA se escribe mientras se calcula el de cursos
+        exporter = ReportExporter(output_dir, formats)
+        with metrics.stage('merge') as m:
+            gpa_data = gpa_report(combine_parts([r['gpa_parts'] for r in good], GPA_MERGE))
+            exporter.submit(gpa_data, GPA_FILE)
+            course_stats = stats_report(combine_parts([r['course_parts'] for r in good], COURSE_MERGE))
+            exporter.submit(course_stats, STATS_FILE)
+            m['rows_out'] = len(gpa_data) + len(course_stats)
+        with metrics.stage('export', len(gpa_data) + len(course_stats)):
+            finish_exports(exporter, logs)
+        exporter.close()
+
+    logs.append(stamp(f"Batch done: {len(good)} of {len(results)} files processed"))
+    write_log(os.path.join(output_dir, LOG_FILE), logs, parts)
+    return gpa_data, course_stats
+
+def run_merge(files, output_dir, policy, workers=None, metrics=None, state=None, formats=('csv',)):
+    # Modo merge: un solo conjunto de datos sin inscripciones repetidas.
+    # Con 'state' los archivos se agregan a la historia guardada ahi
+    os.makedirs(output_dir, exist_ok=True)
+    part = part_log(output_dir, 0)
+    logic = UniversityLogic(write_outputs=False, metrics=metrics, merge_policy=policy, log_file=part,
+                            interactive=False)
+    if state is not None and logic.load_state(state):
+        print(f"Loaded {len(logic.clean_data):,} enrollments from {state}")
+    ok = logic.merge_files(files, workers)
+    logs = []
+    if ok:
+        # Los reportes se escriben mientras se guarda la historia
+        exporter = ReportExporter(output_dir, formats)
+        exporter.submit(logic.gpa_data, GPA_FILE)
+        exporter.submit(logic.course_stats, STATS_FILE)
+        if state is not None:
+            logic.save_state(state)
+        finish_exports(exporter, logs)
+        exporter.close()
+    write_log(os.path.join(output_dir, LOG_FILE), logs, [part] if os.path.exists(part) else [])
+    return logic, ok
+
+def write_metrics(results, metrics, output_dir, total_seconds):
+    # Un solo archivo con las etapas de cada archivo y el total del batch.
+    # Los segundos del total son la suma de todos los procesos (no el reloj)
+    totals = StageMetrics()
+    for r in results:
+        for s in r['stages']:
+            totals.add(s['stage'], s['seconds'], s['rows_in'], s['rows_out'], s['peak_mb'])
+    for s in metrics.report():
+        totals.add(s['stage'], s['seconds'], s['rows_in'], s['rows_out'], s['peak_mb'])
+
+    files = [{'file': r['file'], 'ok': r['ok'], 'seconds': r['seconds'], 'stages': r['stages']}
+             for r in results]
+    totals.write(os.path.join(output_dir, METRICS_FILE), total_seconds=round(total_seconds, 4),
+                 files=files)
+    return totals
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process KU enrollment exports without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="CSV/JSON/NDJSON files, folders or glob patterns")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all CPUs)")
+    parser.add_argument("--chunksize", type=int, default=None, help="read each file in blocks of N rows")
+    parser.add_argument("--output-dir", default=".", help="where to write the KU_academic_* files")
+    parser.add_argument("--metrics", action="store_true",
+                        help="time each stage and write KU_academic_metrics.json")
+    parser.add_argument("--metrics-memory", action="store_true",
+                        help="also track peak memory per stage (much slower)")
+    parser.add_argument("--merge", choices=MERGE_POLICIES, default=None,
+                        help="merge all files into one dataset without duplicate enrollments")
+    parser.add_argument("--state", default=None, metavar="DIR",
+                        help="keep the merged history here and only recompute what the new files change")
+    parser.add_argument("--export-format", nargs="+", choices=list(EXPORT_FORMATS), default=['csv'],
+                        metavar="FORMAT", help="report formats: csv, csv.gz and/or parquet (default: csv)")
+    parser.add_argument("--memory-budget", type=float, default=None, metavar="MB",
+                        help="per-file memory limit; bigger files are read in blocks")
+    args = parser.parse_args(argv)
+
+    files = find_inputs(args.inputs)
+    if not files:
+        print("No .csv, .json, .jsonl or .ndjson files found", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    metrics = StageMetrics(enabled=args.metrics, memory=args.metrics_memory)
+    if args.merge or args.state:
+        logic, ok = run_merge(files, args.output_dir, args.merge or 'latest', args.workers, metrics,
+                              args.state, args.export_format)
+        if args.metrics:
+            metrics.write(os.path.join(args.output_dir, METRICS_FILE), files=logic.files,
+                          total_seconds=round(time.perf_counter() - start, 4))
+            print("\n".join(metrics.summary_lines()))
+        merged = len([f for f in files if f in logic.files])
+        print(f"{merged} of {len(files)} files merged")
+        if ok:
+            print(f"{len(logic.gpa_data)} GPA rows, {len(logic.course_stats)} courses -> {args.output_dir}")
+        return 0 if ok and merged == len(files) else 1
+
+    metrics.start()
+    results = run_batch(files, args.workers, args.chunksize, args.metrics, args.metrics_memory,
+                        args.memory_budget, args.output_dir)
+    gpa_data, course_stats = write_outputs(results, args.output_dir, metrics, args.export_format)
+    metrics.stop()
+    if args.metrics:
+        totals = write_metrics(results, metrics, args.output_dir, time.perf_counter() - start)
+        print("\n".join(totals.summary_lines()))
+
+    for r in results:
+        print(f"{'OK ' if r['ok'] else 'FAIL'} {r['file']}")
+    if gpa_data is not None:
+        print(f"{len(gpa_data)} GPA rows, {len(course_stats)} courses -> {args.output_dir}")
+    return 0 if all(r['ok'] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
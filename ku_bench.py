@@ -0,0 +1,198 @@
+# Copyright 2025 Roberto Canija
+# License: GPL-3.0-or-later
+
+# Benchmark de cada etapa del proceso con datos generados por ku_datagen.py.
+# Mide tiempo, filas por segundo y memoria maxima, y compara con un baseline.
+#
+#   python ku_bench.py --rows 1000000 --save-baseline      (guardar baseline)
+#   python ku_bench.py --rows 1000000                      (comparar)
+#   python ku_bench.py --rows 100000 --format json --no-memory --tables
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import ku_datagen
+import ku_logic
+from ku_logic import UniversityLogic
+
+BASELINE_FILE = "ku_bench_baseline.json"
+TOLERANCE = 0.20   # Mas de 20% mas lento que el baseline cuenta como regresion
+STREAM_CHUNK = 100000
+
+def measure(func, memory=True):
+    # Corre func() y devuelve (resultado, segundos, memoria maxima en MB)
+    gc.collect()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+
+    peak_mb = None
+    if memory:
+        # Otra corrida con tracemalloc (hace todo mas lento, por eso va aparte)
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        result = func()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+    return result, seconds, peak_mb
+
+def quiet(func):
+    # Los logs de UniversityLogic van a la consola, aqui no los queremos
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return run
+
+def load_gui():
+    # "Final Project.py" tiene espacios en el nombre, asi que se importa por ruta
+    import importlib.util
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Final Project.py")
+    spec = importlib.util.spec_from_file_location("final_project", path)
+    gui = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gui)
+    return gui
+
+def run_stages(path, rows, memory=True, tables=False):
+    results = []
+
+    def stage(name, func, rows_in):
+        value, seconds, peak = measure(func, memory)
+        results.append({
+            'stage': name,
+            'seconds': round(seconds, 4),
+            'rows': rows_in,
+            'rows_per_s': round(rows_in / seconds) if seconds > 0 else None,
+            'peak_mb': round(peak, 1) if peak is not None else None,
+        })
+        return value
+
+    # Etapas sueltas (lo mismo que hace load_file por dentro)
+    raw = stage('parse', lambda: ku_logic.read_file(path), rows)
+    df = stage('normalize_columns', lambda: ku_logic.normalize_columns(raw.copy()), len(raw))
+    clean, rejected = stage('validate_rows', lambda: ku_logic.validate_rows(df), len(df))
+    gpa = stage('calculate_gpa', lambda: ku_logic.gpa_report(
+        ku_logic.gpa_parts(clean, ku_logic.gpa_keys(clean.columns))), len(clean))
+    stats = stage('calculate_stats', lambda: ku_logic.stats_report(
+        ku_logic.course_parts(clean, ku_logic.course_keys(clean.columns))), len(clean))
+
+    # El proceso completo, en memoria y por bloques
+    stage('load_file', quiet(lambda: UniversityLogic(write_outputs=False).load_file(path)), rows)
+    stage('load_file_streaming', quiet(lambda: UniversityLogic(write_outputs=False).load_file(
+        path, chunksize=STREAM_CHUNK)), rows)
+
+    if tables:
+        # Crear la tabla de la pantalla y pintar la primera pagina (necesita pantalla)
+        try:
+            import tkinter as tk
+            gui = load_gui()
+            root = tk.Tk()
+            root.withdraw()
+        except Exception as e:
+            print(f"Skipping table stages (no display?): {e}", file=sys.stderr)
+            return results
+
+        def show_table(data, columns):
+            def run():
+                table = gui.DataTable(root, data, columns)
+                table.page = 40
+                table.render()
+                root.update_idletasks()
+                table.destroy()
+            return run
+
+        stage('gpa_table', show_table(gpa, ("student_id", "student_name", "major", "term", "GPA")), len(gpa))
+        stage('stats_table', show_table(stats, ("course_id", "course_name", "enrollment_count",
+                                                "pass_rate", "avg_grade")), len(stats))
+        root.destroy()
+    return results
+
+def compare(results, baseline, tolerance):
+    # Devuelve las etapas que estan mas lentas que el baseline
+    old = {r['stage']: r for r in baseline['stages']}
+    slower = []
+    for r in results:
+        base = old.get(r['stage'])
+        r['baseline_s'] = base['seconds'] if base else None
+        r['change'] = None
+        if base and base['seconds'] > 0:
+            r['change'] = round(r['seconds'] / base['seconds'] - 1, 3)
+            if r['change'] > tolerance:
+                slower.append(r['stage'])
+    return slower
+
+def print_table(results):
+    print(f"{'stage':<22}{'seconds':>10}{'rows/s':>14}{'peak MB':>10}{'vs base':>10}")
+    for r in results:
+        rate = f"{r['rows_per_s']:,}" if r['rows_per_s'] else "-"
+        peak = f"{r['peak_mb']:.1f}" if r['peak_mb'] is not None else "-"
+        change = f"{r['change']:+.0%}" if r.get('change') is not None else "-"
+        print(f"{r['stage']:<22}{r['seconds']:>10.3f}{rate:>14}{peak:>10}{change:>10}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the KU grade processing pipeline.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--format", choices=['csv', 'json', 'jsonl'], default='csv')
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variant", default="default", choices=list(ku_datagen.VARIANTS) + ['random'])
+    parser.add_argument("--input", help="use this file instead of generating one")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--tables", action="store_true", help="also time the GUI tables (needs a display)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--output", help="also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    config = {'rows': args.rows, 'format': args.format, 'error_rate': args.error_rate,
+              'seed': args.seed, 'variant': args.variant, 'input': args.input}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.input
+        if path is None:
+            path = os.path.join(tmp, f"bench.{args.format}")
+            ku_datagen.write_file(path, args.rows, args.error_rate, args.seed, args.variant)
+        rows = args.rows
+        if args.input is not None:
+            rows = sum(len(chunk) for chunk in ku_logic.read_chunks(path, STREAM_CHUNK))
+        results = run_stages(path, rows, memory=not args.no_memory, tables=args.tables)
+
+    report = {'config': config, 'python': sys.version.split()[0], 'pandas': pd.__version__,
+              'stages': results}
+
+    slower = []
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            # Comparar tiempos con otro tamaño de archivo no tiene sentido
+            print(f"Not comparing: baseline was recorded with {baseline.get('config')}", file=sys.stderr)
+        else:
+            slower = compare(results, baseline, args.tolerance)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if slower:
+        print(f"Slower than baseline (> {args.tolerance:.0%}): {', '.join(slower)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# Copyright 2025 Roberto Canija
+# License: GPL-3.0-or-later
+
+# Generador de archivos de inscripciones falsos (pero realistas) para pruebas
+# y benchmarks. Siempre da el mismo archivo con la misma semilla.
+#
+#   python ku_datagen.py data/term_100k.csv --rows 100000 --error-rate 0.02
+#   python ku_datagen.py data/lms.json --rows 10000 --variant random --seed 7
+#   python ku_datagen.py data/lms.jsonl --rows 1000000        (una fila por linea)
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+TERMS = ['2022FA', '2023SP', '2023SU', '2023FA', '2024SP', '2024SU', '2024FA', '2025SP']
+MAJORS = ['Computer Science', 'Nursing', 'Business', 'Psychology', 'Biology', 'Criminal Justice']
+CAMPUSES = ['Fort Lauderdale', 'Orlando', 'Tampa', 'Miami', 'Online']
+DEPARTMENTS = ['CS', 'NUR', 'BUS', 'PSY', 'BIO', 'CJ', 'MATH', 'ENG']
+GRADES = ['A', 'B', 'C', 'D', 'F']
+GRADE_WEIGHTS = [0.30, 0.32, 0.20, 0.10, 0.08]
+CREDITS = [1, 2, 3, 4, 5]
+CREDIT_WEIGHTS = [0.05, 0.05, 0.70, 0.15, 0.05]
+COURSES_PER_DEPARTMENT = 40
+COURSES_PER_STUDENT = 8
+
+# Nombres de columnas que trae cada sistema (los mismos alias que acepta el loader)
+VARIANTS = {
+    'default': {'term': 'term', 'student_id': 'student_id', 'course_id': 'course_id',
+                'student_name': 'student_name'},
+    'academic': {'term': 'Academic Term', 'student_id': 'Student No', 'course_id': 'Course Code',
+                 'student_name': 'Full Name'},
+    'period': {'term': 'period', 'student_id': 'id', 'course_id': 'course_code',
+               'student_name': 'name'},
+}
+
+def generate(rows, error_rate=0.02, seed=0, variant='default', start_row=0, rng=None, students=None):
+    # Devuelve un DataFrame con 'rows' inscripciones. Una fraccion 'error_rate'
+    # de las filas trae un error que el loader debe rechazar
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    students = students or max(1, rows // COURSES_PER_STUDENT)
+    student = rng.integers(0, students, rows) + 100000
+    course = rng.integers(0, len(DEPARTMENTS) * COURSES_PER_DEPARTMENT, rows)
+    department = np.array(DEPARTMENTS)[course // COURSES_PER_DEPARTMENT]
+    number = (course % COURSES_PER_DEPARTMENT + 101).astype(str)
+
+    df = pd.DataFrame({
+        'student_id': student,
+        'student_name': 'Student ' + pd.Series(student).astype(str),
+        'major': np.array(MAJORS)[student % len(MAJORS)],
+        'campus': np.array(CAMPUSES)[(student // 7) % len(CAMPUSES)],
+        'term': np.array(TERMS)[rng.integers(0, len(TERMS), rows)],
+        'course_id': pd.Series(department) + number,
+        'course_name': pd.Series(department) + ' Course ' + number,
+        'department': department,
+        'credits': rng.choice(CREDITS, rows, p=CREDIT_WEIGHTS),
+        'grade': rng.choice(GRADES, rows, p=GRADE_WEIGHTS),
+    })
+
+    # Meter errores: notas invalidas, creditos fuera de rango y creditos no numericos
+    bad = np.flatnonzero(rng.random(rows) < error_rate)
+    if len(bad):
+        kind = rng.integers(0, 4, len(bad))
+        df['credits'] = df['credits'].astype(object)
+        df.loc[bad[kind < 2], 'grade'] = rng.choice(['E', 'X', 'G+', ''], int((kind < 2).sum()))
+        df.loc[bad[kind == 2], 'credits'] = rng.choice([0, 6, 7, 12], int((kind == 2).sum()))
+        df.loc[bad[kind == 3], 'credits'] = rng.choice(['abc', 'three', 'n/a'], int((kind == 3).sum()))
+
+    df.index = range(start_row, start_row + rows)
+    return df.rename(columns=pick_variant(variant, rng))
+
+def pick_variant(variant, rng):
+    if variant == 'random':
+        variant = list(VARIANTS)[rng.integers(0, len(VARIANTS))]
+    return VARIANTS[variant]
+
+def write_file(path, rows, error_rate=0.02, seed=0, variant='default', chunk_rows=1000000):
+    # Escribe el archivo por bloques para poder generar millones de filas
+    # sin tenerlas todas en memoria
+    rng = np.random.default_rng(seed)
+    if variant == 'random':
+        variant = list(VARIANTS)[rng.integers(0, len(VARIANTS))]
+
+    lines = path.endswith(('.jsonl', '.ndjson'))
+    with open(path, 'w', newline='') as f:
+        if path.endswith('.json'):
+            f.write('[')
+        for start in range(0, rows, chunk_rows):
+            n = min(chunk_rows, rows - start)
+            df = generate(n, error_rate, seed, variant, start_row=start, rng=rng,
+                          students=max(1, rows // COURSES_PER_STUDENT))
+            if path.endswith('.csv'):
+                df.to_csv(f, index=False, header=(start == 0))
+            elif lines:
+                f.write(df.to_json(orient='records', lines=True))
+            else:
+                if start > 0:
+                    f.write(',')
+                f.write(df.to_json(orient='records')[1:-1])
+        if path.endswith('.json'):
+            f.write(']')
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic KU enrollment export.")
+    parser.add_argument("path", help="output file (.csv, .json, .jsonl or .ndjson)")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--error-rate", type=float, default=0.02, help="fraction of rows with an error")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variant", default="default", choices=list(VARIANTS) + ['random'],
+                        help="column names to use")
+    args = parser.parse_args(argv)
+
+    if not args.path.endswith(('.csv', '.json', '.jsonl', '.ndjson')):
+        print("Output must be .csv, .json, .jsonl or .ndjson", file=sys.stderr)
+        return 2
+    write_file(args.path, args.rows, args.error_rate, args.seed, args.variant)
+    print(f"Wrote {args.rows} rows to {args.path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2083 @@
+# Copyright 2025 Roberto Canija
+# License: GPL-3.0-or-later
+
+# Logica del programa sin interfaz grafica (no importa tkinter ni matplotlib),
+# asi se puede usar desde la app, desde ku_batch.py o desde otros scripts
+
+import numpy as np
+import pandas as pd
+import os
+import datetime
+import contextlib
+import hashlib
+import json
+import queue
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# pyarrow es opcional: si esta instalado el cache usa Parquet (si no, pickle)
+# y los CSV se leen con su motor, que es mas rapido
+try:
+    import pyarrow
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# --- LOGICA DEL PROGRAMA (BACKEND) ---
+
+# --- REGLAS DE VALIDACION ---
+VALID_GRADES = ['A', 'B', 'C', 'D', 'F']
+MIN_CREDITS = 1
+MAX_CREDITS = 5
+
+def _as_text(col):
+    # Igual que hacer str(valor) fila por fila, pero para toda la columna
+    text = col.astype("string")
+    missing = text.isna()
+    if missing.any():
+        # Los vacios (NaN/None) se escriben como Python los escribe ('nan', 'None')
+        text[missing] = col[missing].map(str)
+    return text
+
+def _credit_errors(col):
+    # Devuelve el mensaje de error de cada fila con creditos malos (None si esta bien)
+    nums = pd.to_numeric(col, errors='coerce')
+    errors = pd.Series(None, index=col.index, dtype=object)
+
+    # Las filas que no se pudieron convertir las revisamos con float() como antes,
+    # asi el mensaje es exactamente el mismo (y 'nan' sigue siendo valido)
+    unparsed = nums.isna() & col.notna()
+    for index, value in col[unparsed].items():
+        try:
+            nums[index] = float(value)
+        except Exception as e:
+            errors[index] = str(e)
+
+    # Fuera de rango (NaN no es < 1 ni > 5, igual que en la version fila por fila)
+    out_of_range = errors.isna() & ((nums < MIN_CREDITS) | (nums > MAX_CREDITS))
+    errors[out_of_range] = nums[out_of_range].map(lambda c: f"Credits out of range: {float(c)}")
+    return errors
+
+def validate_rows(df):
+    # Valida todas las filas de una vez usando mascaras por columna.
+    # Devuelve (filas buenas, tabla de rechazos con row/column/reason)
+    credit_errors = _credit_errors(df['credits'])
+    bad_credits = credit_errors.notna()
+
+    grades = _as_text(df['grade']).str.upper().str.strip()
+    bad_grades = ~grades.isin(VALID_GRADES) & ~bad_credits
+
+    # Los creditos se revisan primero, asi que cada fila tiene un solo motivo
+    reasons = credit_errors.copy()
+    reasons[bad_grades] = ("Invalid grade: " + grades[bad_grades]).astype(object)
+    columns = pd.Series('grade', index=df.index).where(~bad_credits, 'credits')
+
+    bad = bad_credits | bad_grades
+    rejected = pd.DataFrame({
+        'row': df.index[bad],
+        'column': columns[bad].values,
+        'reason': reasons[bad].values,
+    })
+
+    clean = df[~bad]
+    return clean, rejected
+
+# --- LECTURA Y COLUMNAS ---
+REQUIRED_COLUMNS = ['student_id', 'term', 'credits', 'grade']
+
+# Columnas que usa el programa (ya normalizadas). Las demas columnas de los
+# exportes del SIS no se leen
+SCHEMA_COLUMNS = REQUIRED_COLUMNS + ['course_id', 'student_name', 'major', 'campus',
+                                     'course_name', 'department']
+# Se leen como texto sin adivinar el tipo. Los creditos tambien: validate_rows
+# los convierte y asi da los mismos mensajes de error. student_id, term y
+# course_id se dejan adivinar para que los reportes salgan en el mismo orden
+TEXT_COLUMNS = ['credits', 'grade', 'student_name', 'major', 'campus', 'course_name', 'department']
+
+def normalize_names(columns):
+    # --- LIMPIEZA DE COLUMNAS (Manual) ---
+    # Pasamos todo a minusculas y quitamos espacios para evitar problemas
+    names = [c.strip().lower().replace(' ', '_') for c in columns]
+
+    # Arreglamos nombres de columnas manualmente (Requisito del compañero)
+    # A veces el archivo trae 'academic_term' y a veces 'period'
+    aliases = {}
+    if 'academic_term' in names:
+        aliases['academic_term'] = 'term'
+    elif 'period' in names:
+        aliases['period'] = 'term'
+
+    if 'student_no' in names:
+        aliases['student_no'] = 'student_id'
+    elif 'id' in names:
+        aliases['id'] = 'student_id'
+
+    if 'course_code' in names:
+        aliases['course_code'] = 'course_id'
+
+    if 'full_name' in names:
+        aliases['full_name'] = 'student_name'
+    elif 'name' in names:
+        aliases['name'] = 'student_name'
+    return [aliases.get(name, name) for name in names]
+
+def normalize_columns(df):
+    df.columns = normalize_names(df.columns)
+    return df
+
+def csv_schema(filepath):
+    # Lee solo la primera linea y devuelve (usecols, dtype) con los nombres
+    # tal como vienen en el archivo
+    header = list(pd.read_csv(filepath, nrows=0).columns)
+    names = normalize_names(header)
+    usecols = [raw for raw, name in zip(header, names) if name in SCHEMA_COLUMNS]
+    dtype = {raw: str for raw, name in zip(header, names) if name in TEXT_COLUMNS}
+    return usecols, dtype
+
+def schema_columns(df):
+    # Deja solo las columnas que usa el programa (para JSON, que no tiene usecols)
+    keep = [name in SCHEMA_COLUMNS for name in normalize_names(df.columns)]
+    return df.loc[:, keep]
+
+# JSON: arreglo normal (.json) o una fila por linea (.jsonl/.ndjson).
+# Se leen por bloques de JSON_BATCH_ROWS filas, asi nunca estan todas las
+# filas como objetos de Python al mismo tiempo
+SUPPORTED_EXTENSIONS = ('.csv', '.json', '.jsonl', '.ndjson')
+JSON_LINES_EXTENSIONS = ('.jsonl', '.ndjson')
+JSON_BATCH_ROWS = 50000
+JSON_READ_CHARS = 1024 * 1024
+_JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+def iter_json_array(f):
+    # Devuelve los objetos de un arreglo JSON uno por uno, leyendo el archivo
+    # de a pedazos de JSON_READ_CHARS
+    decoder = json.JSONDecoder()
+    buf = f.read(JSON_READ_CHARS).lstrip()
+    pos = 1   # Saltamos el '['
+    eof = False
+    while True:
+        pos = _JSON_SEPARATORS.match(buf, pos).end()
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            if pos == len(buf):
+                raise ValueError("need more data")
+            record, pos = decoder.raw_decode(buf, pos)
+        except ValueError:
+            # El objeto quedo cortado al final del pedazo: leemos el siguiente
+            if eof:
+                raise
+            more = f.read(JSON_READ_CHARS)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        yield record
+
+def iter_json_lines(f):
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+def json_types(df):
+    # Los mismos tipos que da pd.read_json: texto con numeros pasa a numero y
+    # los float sin decimales (ni vacios) pasan a int
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            try:
+                s = s.astype('float64')
+            except (ValueError, TypeError):
+                continue
+        if s.dtype == 'float64' and len(s):
+            try:
+                as_int = s.astype('int64')
+            except (ValueError, TypeError, OverflowError):
+                as_int = None
+            if as_int is not None and (as_int == s).all():
+                s = as_int
+        df[col] = s
+    return df
+
+def read_json_batches(filepath, batch_rows=JSON_BATCH_ROWS):
+    # Lee un archivo JSON en bloques de 'batch_rows' filas (solo columnas del
+    # esquema, los indices siguen corriendo)
+    with open(filepath, encoding='utf-8') as f:
+        if filepath.endswith(JSON_LINES_EXTENSIONS):
+            records = iter_json_lines(f)
+        else:
+            start = f.read(1)
+            while start.isspace():
+                start = f.read(1)
+            if start != '[':
+                # No es un arreglo (ej. {"columna": {...}}): lo lee pandas entero
+                f.seek(0)
+                yield schema_columns(pd.read_json(f))
+                return
+            f.seek(0)
+            records = iter_json_array(f)
+
+        row = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == batch_rows:
+                yield schema_columns(pd.DataFrame.from_records(batch, index=range(row, row + len(batch))))
+                row += len(batch)
+                batch = []
+        if batch or row == 0:
+            yield schema_columns(pd.DataFrame.from_records(batch, index=range(row, row + len(batch))))
+
+def read_file(filepath):
+    # Lee el archivo completo, solo con las columnas del esquema
+    if not filepath.endswith('.csv'):
+        batches = list(read_json_batches(filepath))
+        return json_types(pd.concat(batches) if len(batches) > 1 else batches[0])
+    usecols, dtype = csv_schema(filepath)
+    if HAS_PYARROW:
+        try:
+            return pd.read_csv(filepath, usecols=usecols, dtype=dtype, engine='pyarrow')
+        except Exception:
+            # Algunos archivos (ej. encabezados repetidos) solo los lee el motor de pandas
+            pass
+    return pd.read_csv(filepath, usecols=usecols, dtype=dtype)
+
+def read_chunks(filepath, chunksize):
+    # Lee el archivo en bloques de 'chunksize' filas (los indices siguen corriendo)
+    if filepath.endswith('.csv'):
+        # El motor pyarrow no lee por bloques, aqui va el de pandas
+        usecols, dtype = csv_schema(filepath)
+        yield from pd.read_csv(filepath, usecols=usecols, dtype=dtype, chunksize=chunksize)
+    else:
+        for df in read_json_batches(filepath, chunksize):
+            yield json_types(df)
+
+def missing_columns(df):
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+# --- MOTOR DE REPORTES (agregacion por grupos) ---
+# Tabla de puntos y notas que aprueban (D o mejor aprueba)
+GRADE_POINTS = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
+PASSING_GRADES = ['A', 'B', 'C', 'D']
+
+# Columnas de cada reporte (las opcionales se usan solo si vienen en el archivo)
+GPA_KEYS = ['student_id', 'term']
+GPA_OPTIONAL_KEYS = ['student_name', 'major', 'campus']
+GPA_COLUMN = 'GPA'
+COURSE_KEYS = ['course_id']
+COURSE_OPTIONAL_KEYS = ['course_name', 'department']
+STATS_COLUMNS = ['enrollment_count', 'avg_grade', 'pass_rate', 'highest_grade', 'lowest_grade']
+
+# Como se juntan dos resultados parciales del mismo grupo
+GPA_MERGE = {'quality_points': 'sum', 'credits': 'sum'}
+COURSE_MERGE = {'enrollment_count': 'sum', 'points_sum': 'sum', 'points_n': 'sum',
+                'passes': 'sum', 'grade_min': 'min', 'grade_max': 'max'}
+
+def gpa_keys(columns):
+    return GPA_KEYS + [c for c in GPA_OPTIONAL_KEYS if c in columns]
+
+def course_keys(columns):
+    return COURSE_KEYS + [c for c in COURSE_OPTIONAL_KEYS if c in columns]
+
+def gpa_parts(clean, keys):
+    # Por estudiante/termino: puntos de calidad y creditos (un solo groupby)
+    points = clean['grade'].str.upper().map(GRADE_POINTS)
+    credits = clean['credits'].astype(float)
+    data = clean[keys].assign(quality_points=points * credits, credits=credits)
+    return data.groupby(keys, observed=True)[['quality_points', 'credits']].sum()
+
+def course_parts(clean, keys):
+    # Por curso: cantidad, suma de notas, aprobados, nota mas alta y mas baja
+    upper = clean['grade'].str.upper()
+    points = upper.map(GRADE_POINTS)
+    data = clean[keys].assign(
+        enrollment_count=1, points_sum=points, points_n=points.notna(),
+        passes=upper.isin(PASSING_GRADES), grade_min=clean['grade'], grade_max=clean['grade'])
+    return group_parts(data.set_index(keys), COURSE_MERGE)
+
+def group_parts(parts, how, sort=True):
+    # Una fila por grupo sobre resultados parciales ya concatenados.
+    # min/max de texto (las notas) no tiene version rapida en pandas y cae a
+    # un loop por grupo: se hacen sobre codigos enteros en el mismo orden
+    text = {c: pd.factorize(parts[c], sort=True) for c, f in how.items()
+            if f in ('min', 'max') and not pd.api.types.is_numeric_dtype(parts[c].dtype)}
+    if text:
+        parts = parts.assign(**{c: codes for c, (codes, _) in text.items()})
+    out = parts.groupby(level=list(range(parts.index.nlevels)), observed=True, sort=sort).agg(how)
+    for c, (_, uniques) in text.items():
+        out[c] = uniques.take(out[c].to_numpy())
+    return out
+
+def merge_parts(running, part, how, sort=True):
+    # Junta lo acumulado con un resultado parcial nuevo (una fila por grupo)
+    if running is None:
+        return part
+    return group_parts(pd.concat([running, part]), how, sort)
+
+def letter_grades(avg):
+    # Convertir promedio a letra (NaN queda como 'F', igual que antes)
+    letters = pd.cut(avg, [float('-inf'), 0.5, 1.5, 2.5, 3.5, float('inf')],
+                     right=False, labels=['F', 'D', 'C', 'B', 'A'])
+    return letters.astype(object).fillna('F')
+
+def plain_columns(df):
+    # Los reportes salen con tipos normales aunque clean_data use categorias
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+def gpa_report(parts):
+    gpa = (parts['quality_points'] / parts['credits']).where(parts['credits'] > 0, 0.0)
+    report = parts.index.to_frame(index=False)
+    report[GPA_COLUMN] = gpa.round(2).values
+    return plain_columns(report)
+
+def stats_report(parts):
+    # Promedio numerico (solo notas con puntos) y pass rate sobre el total
+    avg = parts['points_sum'] / parts['points_n'].where(parts['points_n'] > 0)
+    report = parts.index.to_frame(index=False)
+    values = {
+        'enrollment_count': parts['enrollment_count'],
+        'avg_grade': letter_grades(avg),
+        'pass_rate': (parts['passes'] / parts['enrollment_count']).round(2),
+        'highest_grade': parts['grade_min'],
+        'lowest_grade': parts['grade_max'],
+    }
+    for col in STATS_COLUMNS:
+        report[col] = values[col].values
+    return plain_columns(report)
+
+PART_BUFFER_ROWS = 250000    # Filas limpias que se agrupan de una vez en modo streaming
+
+class RunningReports:
+    # Acumula los resultados parciales bloque por bloque (modo streaming).
+    # Al final da los mismos reportes que calculate_gpa y calculate_stats
+    def __init__(self):
+        self.rows = 0
+        self.gpa_keys = None
+        self.course_keys = None
+        self.gpa_parts = None
+        self.course_parts = None
+        # Bloques limpios todavia sin agrupar (hasta PART_BUFFER_ROWS filas),
+        # y los resultados ya agrupados esperando en el arbol: [nivel, gpa, cursos]
+        self.buffer = []
+        self.buffer_rows = 0
+        self.pending = []
+
+    def add(self, clean):
+        if clean.empty:
+            return
+        if self.gpa_keys is None:
+            self.gpa_keys = gpa_keys(clean.columns)
+            self.course_keys = course_keys(clean.columns)
+        self.rows += len(clean)
+
+        self.buffer.append(clean)
+        self.buffer_rows += len(clean)
+        if self.buffer_rows >= PART_BUFFER_ROWS:
+            self.flush()
+
+    def flush(self):
+        # Agrupa los bloques guardados de una vez y pasa el resultado al arbol:
+        # solo se juntan dos resultados del mismo nivel, asi cada grupo se
+        # vuelve a agrupar log(bloques) veces y no una vez por bloque (juntar
+        # todo lo acumulado con cada bloque era cuadratico)
+        if not self.buffer:
+            return
+        clean = pd.concat(self.buffer, ignore_index=True)
+        gpa = gpa_parts(clean, self.gpa_keys)
+        course = course_parts(clean, self.course_keys)
+        self.buffer = []
+        self.buffer_rows = 0
+        level = 0
+        while self.pending and self.pending[-1][0] == level:
+            _, old_gpa, old_course = self.pending.pop()
+            gpa = merge_parts(old_gpa, gpa, GPA_MERGE, sort=False)
+            course = merge_parts(old_course, course, COURSE_MERGE, sort=False)
+            level += 1
+        self.pending.append([level, gpa, course])
+
+    def combine(self):
+        # Junta lo que quede en un solo resultado ordenado (como un groupby)
+        self.flush()
+        if not self.pending:
+            return
+        if self.gpa_parts is not None:
+            self.pending.append([None, self.gpa_parts, self.course_parts])
+        self.gpa_parts = group_parts(pd.concat([p[1] for p in self.pending]), GPA_MERGE)
+        self.course_parts = group_parts(pd.concat([p[2] for p in self.pending]), COURSE_MERGE)
+        self.pending = []
+
+    def gpa_report(self):
+        self.combine()
+        return gpa_report(self.gpa_parts)
+
+    def stats_report(self):
+        self.combine()
+        return stats_report(self.course_parts)
+
+# --- TABLAS EN DISCO ---
+def write_table(df, path):
+    # Guarda un DataFrame como path.parquet (si hay pyarrow) o path.pkl
+    if HAS_PYARROW:
+        try:
+            df.to_parquet(path + ".parquet")
+            return path + ".parquet"
+        except Exception:
+            # Columnas con tipos mezclados no entran en Parquet
+            if os.path.exists(path + ".parquet"):
+                os.remove(path + ".parquet")
+    df.to_pickle(path + ".pkl", protocol=5)
+    return path + ".pkl"
+
+def remove_table(path):
+    for ext in (".parquet", ".pkl"):
+        if os.path.exists(path + ext):
+            os.remove(path + ext)
+
+def read_table(path):
+    # Lee lo que guardo write_table (path sin extension)
+    if os.path.exists(path + ".parquet"):
+        return pd.read_parquet(path + ".parquet", memory_map=True)
+    return pd.read_pickle(path + ".pkl")
+
+# --- TIPOS COMPACTOS Y LIMITE DE MEMORIA ---
+CATEGORY_MAX_RATIO = 0.5     # Texto con menos de 50% de valores distintos -> categoria
+PARSE_MEMORY_FACTOR = 3      # Un archivo ocupa ~3 veces su tamaño una vez leido
+SPILL_DIR = ".ku_spill"
+
+def compact_frame(df):
+    # Plan de tipos compactos para clean_data:
+    # - grade: categoria ordenada (codigos int8, min/max siguen funcionando)
+    # - credits: int8 si todos son enteros, si no float64
+    # - texto con pocos valores distintos (term, major, campus...): categoria
+    # Los valores no cambian, solo como se guardan
+    columns = {}
+    for col in df.columns:
+        s = df[col]
+        if col == 'grade':
+            s = s.astype(pd.CategoricalDtype(sorted(s.dropna().unique()), ordered=True))
+        elif col == 'credits':
+            s = s.astype(float)
+            if s.notna().all() and (s % 1 == 0).all():
+                s = s.astype('int8')
+        elif (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)) \
+                and not isinstance(s.dtype, pd.CategoricalDtype) \
+                and s.nunique() <= CATEGORY_MAX_RATIO * len(s):
+            s = s.astype('category')
+        columns[col] = s
+    return pd.DataFrame(columns, index=df.index)
+
+def frame_mb(df):
+    return df.memory_usage(index=True, deep=True).sum() / 1024 ** 2
+
+def budget_chunksize(filepath, budget_mb):
+    # Si el archivo no entra en el limite de memoria, devuelve cuantas filas
+    # leer por bloque (un cuarto del limite por bloque). Si entra, devuelve None
+    size = os.path.getsize(filepath)
+    if size * PARSE_MEMORY_FACTOR <= budget_mb * 1024 ** 2:
+        return None
+    with open(filepath, 'rb') as f:
+        sample = f.read(1024 * 1024)
+    rows = sample.count(b'{') if filepath.endswith('.json') else sample.count(b'\n')
+    row_bytes = len(sample) / max(1, rows)
+    return max(1000, int(budget_mb * 1024 ** 2 / 4 / (row_bytes * PARSE_MEMORY_FACTOR)))
+
+# --- CACHE DE DATOS LIMPIOS ENTRE CORRIDAS ---
+CACHE_DIR = ".ku_cache"
+CACHE_MAX_BYTES = 2 * 1024 ** 3   # 2 GB como maximo en disco
+CACHE_VERSION = 3                 # Subir si cambian las reglas de validacion
+CACHE_TABLES = ['clean_data', 'gpa_data', 'course_stats', 'rejections', 'gpa_parts', 'course_parts']
+
+class ResultCache:
+    # Guarda clean_data y los reportes de cada archivo ya procesado.
+    # La llave es el contenido del archivo (hash), asi que si el archivo no
+    # cambio no hay que volver a leerlo ni validarlo
+    def __init__(self, folder=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(folder, "index.json")
+        os.makedirs(folder, exist_ok=True)
+
+    def load_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def file_key(self, filepath):
+        # Si la ruta, el tamaño y la fecha no cambiaron usamos el hash guardado,
+        # si no leemos el archivo entero para sacar el hash del contenido.
+        # El hash incluye CACHE_VERSION: uno guardado con otra version no sirve
+        path = os.path.abspath(filepath)
+        info = os.stat(path)
+        index = self.load_index()
+        known = index.get(path)
+        if (known and known.get('version') == CACHE_VERSION and known['size'] == info.st_size
+                and known['mtime'] == info.st_mtime_ns):
+            return known['hash']
+
+        digest = hashlib.blake2b(f"v{CACHE_VERSION}".encode(), digest_size=20)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(8 * 1024 * 1024), b''):
+                digest.update(block)
+        key = digest.hexdigest()
+
+        index[path] = {'size': info.st_size, 'mtime': info.st_mtime_ns, 'hash': key, 'version': CACHE_VERSION}
+        with open(self.index_path, 'w') as f:
+            json.dump(index, f)
+        return key
+
+    def get(self, filepath):
+        # Devuelve un dict con las tablas, o None si el archivo no esta en cache
+        entry = os.path.join(self.folder, self.file_key(filepath))
+        if not os.path.isdir(entry):
+            return None
+        tables = {name: read_table(os.path.join(entry, name)) for name in CACHE_TABLES}
+        os.utime(entry)  # Marcar como usado recien (para borrar los mas viejos primero)
+        return tables
+
+    def put(self, filepath, tables):
+        key = self.file_key(filepath)
+        entry = os.path.join(self.folder, key)
+        if os.path.isdir(entry):
+            return
+
+        # Escribimos en una carpeta temporal y la renombramos al final,
+        # asi nunca queda una entrada a medias
+        tmp = entry + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in CACHE_TABLES:
+            write_table(tables[name], os.path.join(tmp, name))
+        os.replace(tmp, entry)
+        self.evict()
+
+    def evict(self):
+        # Borrar las entradas usadas hace mas tiempo hasta quedar bajo el limite
+        entries = []
+        for name in os.listdir(self.folder):
+            entry = os.path.join(self.folder, name)
+            if os.path.isdir(entry) and not name.endswith(".tmp"):
+                size = sum(e.stat().st_size for e in os.scandir(entry))
+                entries.append((os.stat(entry).st_mtime, size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+# --- ALMACENAMIENTO EN SQLITE (opcional) ---
+# Para historias que no caben en memoria: las filas validas van a una base
+# SQLite en disco y los reportes se calculan con SQL usando los indices.
+# Los DataFrames de salida (gpa_data, course_stats) y los CSV no cambian
+DB_FILE = "KU_academic.db"
+SQL_CHUNK_ROWS = 200000
+ENROLLMENTS_TABLE = "enrollments"
+GPA_TABLE = "gpa_report"
+STATS_TABLE = "course_report"
+# Nombre del indice -> columnas (solo se crean si la columna vino en el archivo)
+SQL_INDEXES = {
+    'idx_enrollments_student': ['student_id', 'term'],
+    'idx_enrollments_term': ['term'],
+    'idx_enrollments_course': ['course_id'],
+    'idx_enrollments_department': ['department'],
+}
+
+def _sql_name(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _sql_points(grade):
+    # Lo mismo que GRADE_POINTS.get(grade.upper()) pero en SQL
+    cases = " ".join(f"WHEN '{g}' THEN {p}" for g, p in GRADE_POINTS.items())
+    return f"(CASE UPPER({grade}) {cases} END)"
+
+class SQLiteStore:
+    # Una base SQLite con las inscripciones validas y los reportes.
+    # La usan el hilo de carga y la interfaz a la vez, por eso el lock
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.columns = []
+        self.rows = 0
+
+    def start(self, columns):
+        # Empieza un conjunto de datos nuevo (borra el anterior)
+        self.columns = list(columns)
+        self.rows = 0
+        with self.lock, self.conn:
+            self.conn.execute(f"DROP TABLE IF EXISTS {ENROLLMENTS_TABLE}")
+            # Columnas sin tipo: SQLite guarda cada valor como viene (numero o texto)
+            cols = ", ".join(_sql_name(c) for c in self.columns)
+            self.conn.execute(f"CREATE TABLE {ENROLLMENTS_TABLE} ({cols})")
+
+    def add(self, clean):
+        # Agrega un bloque de filas validas
+        with self.lock, self.conn:
+            clean[self.columns].to_sql(ENROLLMENTS_TABLE, self.conn, if_exists='append', index=False)
+        self.rows += len(clean)
+
+    def finish(self):
+        # Los indices se crean al final (cargar sin indices es mucho mas rapido)
+        with self.lock, self.conn:
+            for name, cols in SQL_INDEXES.items():
+                if all(c in self.columns for c in cols):
+                    cols = ", ".join(_sql_name(c) for c in cols)
+                    self.conn.execute(f"CREATE INDEX {name} ON {ENROLLMENTS_TABLE} ({cols})")
+            self.conn.execute(f"ANALYZE {ENROLLMENTS_TABLE}")
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def grouped(self, keys, aggregates):
+        # SELECT keys, aggregates ... GROUP BY keys (sin grupos con vacios,
+        # igual que groupby de pandas). El filtro va en HAVING: en WHERE SQLite
+        # recorre el indice de student_id y es mas lento que leer la tabla
+        cols = ", ".join(_sql_name(k) for k in keys)
+        not_null = " AND ".join(f"{_sql_name(k)} IS NOT NULL" for k in keys)
+        sql = (f"SELECT {cols}, {aggregates} FROM {ENROLLMENTS_TABLE} "
+               f"GROUP BY {cols} HAVING {not_null} ORDER BY {cols}")
+        return self.query(sql).set_index(keys)
+
+    def gpa_parts(self, keys):
+        # Lo mismo que gpa_parts(clean, keys)
+        points = _sql_points('grade')
+        return self.grouped(keys, f"TOTAL({points} * credits) AS quality_points, "
+                                  f"TOTAL(credits) AS credits")
+
+    def course_parts(self, keys):
+        # Lo mismo que course_parts(clean, keys)
+        points = _sql_points('grade')
+        passing = ", ".join(f"'{g}'" for g in PASSING_GRADES)
+        return self.grouped(keys, f"COUNT(*) AS enrollment_count, TOTAL({points}) AS points_sum, "
+                                  f"COUNT({points}) AS points_n, "
+                                  f"SUM(UPPER(grade) IN ({passing})) AS passes, "
+                                  f"MIN(grade) AS grade_min, MAX(grade) AS grade_max")
+
+    def save_report(self, table, df):
+        with self.lock, self.conn:
+            df.to_sql(table, self.conn, if_exists='replace', index=False)
+
+    def row_ids(self, table, columns, text="", sort_col=None, ascending=True):
+        # Los rowid de la tabla filtrados y ordenados, para paginar en la interfaz.
+        # El filtro busca el texto en cualquier columna (sin importar mayusculas)
+        sql = f"SELECT rowid FROM {table}"
+        params = []
+        if text:
+            like = text.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            checks = [f"LOWER(CAST({_sql_name(c)} AS TEXT)) LIKE ? ESCAPE '\\'" for c in columns]
+            sql += " WHERE " + " OR ".join(checks)
+            params = [f"%{like}%"] * len(columns)
+        if sort_col is not None:
+            # Los vacios van al final, como en pandas
+            col = _sql_name(sort_col)
+            sql += f" ORDER BY {col} IS NULL, {col} {'ASC' if ascending else 'DESC'}, rowid"
+        else:
+            sql += " ORDER BY rowid"
+        try:
+            return self.query(sql, params)['rowid'].to_numpy()
+        except Exception:
+            return pd.Series([], dtype='int64').to_numpy()   # La tabla todavia no existe
+
+    def rows_by_id(self, table, columns, ids):
+        # Las filas con esos rowid, en el mismo orden
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        cols = ", ".join(_sql_name(c) for c in columns)
+        marks = ", ".join("?" * len(ids))
+        with self.lock:
+            found = self.conn.execute(f"SELECT rowid, {cols} FROM {table} WHERE rowid IN ({marks})",
+                                      ids).fetchall()
+        by_id = {row[0]: row[1:] for row in found}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# --- DATOS PARA LOS GRAFICOS ---
+# Se calculan una sola vez por carga, la interfaz solo dibuja.
+# Las llaves son los mismos numeros de grafico que usa App.plot
+def chart_data(gpa_data, course_stats):
+    charts = {}
+
+    # 1: Top 10 cursos por inscripcion
+    if 'enrollment_count' in course_stats.columns:
+        top = course_stats.sort_values('enrollment_count', ascending=False).head(10)
+        label_col = 'course_name' if 'course_name' in top.columns else 'course_id'
+        charts[1] = (top[label_col].astype(str).tolist(), top['enrollment_count'].tolist())
+
+    # 2: Distribucion de GPA
+    if GPA_COLUMN in gpa_data.columns:
+        gpas = gpa_data[GPA_COLUMN]
+        counts = [
+            int((gpas < 3.0).sum()),
+            int(((gpas >= 3.0) & (gpas < 3.5)).sum()),
+            int(((gpas >= 3.5) & (gpas < 4.0)).sum()),
+            int((gpas == 4.0).sum()),
+        ]
+        charts[2] = (['< 3.0', '3.0 - 3.49', '3.5 - 3.99', '4.0'], counts)
+
+    # 3: Pass rate promedio por departamento
+    if 'department' in course_stats.columns:
+        rates = course_stats.groupby('department', observed=True)['pass_rate'].mean()
+        charts[3] = (rates.index.astype(str).tolist(), rates.tolist())
+    return charts
+
+# --- BUSQUEDA DE ESTUDIANTES E HISTORIA DE GPA ---
+# Orden de los periodos dentro del año (ej. 2024SP < 2024SU < 2024FA)
+TERM_SEASONS = {'WI': 0, 'SP': 1, 'SU': 2, 'FA': 3}
+HISTORY_COLUMNS = ['student_id', 'term', 'credits', GPA_COLUMN, 'cumulative_GPA', 'GPA_change']
+
+def term_order(terms):
+    # Numero para ordenar los periodos en el tiempo. '2024FA' -> 20243.
+    # Los que no tienen año + periodo (ej. 202410) se ordenan por su valor.
+    # Se calcula una vez por periodo distinto (hay pocos) y no por fila
+    codes, uniques = pd.factorize(terms)
+    uniques = pd.Series(uniques)
+    parts = uniques.astype(str).str.extract(r'^\s*(\d{4})\s*([A-Za-z]{2})\s*$')
+    season = parts[1].str.upper().map(TERM_SEASONS)
+    order = (parts[0].astype(float) * 10 + season).fillna(pd.to_numeric(uniques, errors='coerce'))
+    return pd.Series(np.append(order.to_numpy(dtype=float), np.nan)[codes], index=terms.index)
+
+def gpa_history(parts):
+    # Una fila por estudiante y periodo, en orden de tiempo, con el GPA del
+    # periodo, el acumulado y el cambio contra el periodo anterior.
+    # El acumulado sale de un solo cumsum agrupado de puntos y creditos
+    sums = parts.groupby(level=['student_id', 'term'], observed=True)[['quality_points', 'credits']].sum()
+    history = plain_ids(plain_columns(sums.reset_index()))
+    history['_order'] = term_order(history['term'])
+    history = history.sort_values(['student_id', '_order', 'term'], key=sort_key,
+                                  kind='stable').reset_index(drop=True)
+
+    running = history.groupby('student_id', sort=False)[['quality_points', 'credits']].cumsum()
+    history[GPA_COLUMN] = (history['quality_points'] / history['credits']).where(
+        history['credits'] > 0, 0.0).round(2)
+    history['cumulative_GPA'] = (running['quality_points'] / running['credits']).where(
+        running['credits'] > 0, 0.0).round(2)
+    history['GPA_change'] = history.groupby('student_id', sort=False)[GPA_COLUMN].diff().round(2)
+    return history[HISTORY_COLUMNS]
+
+def sort_key(col):
+    # Columnas con numeros y texto mezclados (ej. student_id 1 y "S2" en un
+    # JSON) se ordenan como texto
+    if pd.api.types.is_object_dtype(col.dtype):
+        return col.astype(str)
+    return col
+
+def plain_ids(df):
+    # Un student_id vacio hace que pandas lea la columna como float (9.0):
+    # si todos los demas son enteros vuelven a ser enteros
+    ids = df['student_id']
+    if pd.api.types.is_float_dtype(ids.dtype) and (ids.dropna() % 1 == 0).all():
+        df['student_id'] = ids.astype('Int64')
+    return df
+
+def id_keys(ids):
+    # Arreglo ordenable de student_id para la busqueda binaria: los numeros
+    # como numeros, cualquier otra cosa como texto (igual que sort_key)
+    if pd.api.types.is_integer_dtype(ids.dtype):
+        return ids.to_numpy(dtype='int64')
+    if pd.api.types.is_float_dtype(ids.dtype):
+        return ids.to_numpy(dtype=float)
+    return ids.astype(str).to_numpy(dtype=object)
+
+def _slice(keys, first, last):
+    # Posiciones [inicio, fin) de las claves entre first y last en un arreglo
+    # ordenado (busqueda binaria)
+    try:
+        return keys.searchsorted(first, 'left'), keys.searchsorted(last, 'right')
+    except TypeError:
+        return 0, 0
+
+class StudentIndex:
+    # Indice en memoria para buscar estudiantes sin recorrer gpa_data:
+    # - historia ordenada por student_id (busqueda binaria para un id exacto)
+    # - nombres en minusculas ordenados (busqueda binaria para un prefijo)
+    def __init__(self, parts):
+        # Arreglos de numpy: buscar en texto de pyarrow convierte todo cada vez
+        self.history = gpa_history(parts)
+        self.ids = id_keys(self.history['student_id'])
+
+        self.names = None
+        if 'student_name' in parts.index.names:
+            names = parts.index.to_frame(index=False)[['student_id', 'student_name']]
+            names = plain_ids(plain_columns(names.dropna().drop_duplicates()))
+            names['key'] = names['student_name'].astype(str).str.lower()
+            self.names = names.sort_values(['key', 'student_id'], key=sort_key, kind='stable').reset_index(drop=True)
+            self.name_keys = self.names['key'].to_numpy(dtype=object)
+            self.names_by_id = names.sort_values('student_id', key=sort_key, kind='stable').reset_index(drop=True)
+            self.name_ids = id_keys(self.names_by_id['student_id'])
+
+    def parse_id(self, text):
+        # El texto de la busqueda con el mismo tipo que los student_id
+        number = {'i': int, 'u': int, 'f': float}.get(self.ids.dtype.kind)
+        if number is not None:
+            try:
+                return number(str(text).strip())
+            except ValueError:
+                return None
+        return str(text).strip()
+
+    def lookup(self, student_id):
+        # Todos los periodos de un estudiante, en orden (vacio si no existe)
+        if student_id is None:
+            return self.history.iloc[0:0]
+        if self.ids.dtype == object:
+            student_id = str(student_id)
+        start, end = _slice(self.ids, student_id, student_id)
+        return self.history.iloc[start:end]
+
+    def search(self, text, limit=50):
+        # Estudiantes con ese id exacto o cuyo nombre empieza con 'text'
+        text = str(text).strip()
+        columns = ['student_id', 'student_name']
+        found = []
+        student_id = self.parse_id(text)
+        if student_id is not None and text:
+            if self.names is not None:
+                key = str(student_id) if self.name_ids.dtype == object else student_id
+                start, end = _slice(self.name_ids, key, key)
+                found.append(self.names_by_id.iloc[start:end][columns])
+            elif len(self.lookup(student_id)):
+                found.append(pd.DataFrame({'student_id': [student_id], 'student_name': [None]}))
+        if self.names is not None and text:
+            prefix = text.lower()
+            start, end = _slice(self.name_keys, prefix, prefix + '\U0010ffff')
+            found.append(self.names.iloc[start:min(end, start + limit)][columns])
+        if not found:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(found, ignore_index=True).drop_duplicates().head(limit)
+
+# --- ARCHIVOS DE SALIDA ---
+GPA_FILE = "KU_academic_master_gpa.csv"
+STATS_FILE = "KU_academic_stats_by_course.csv"
+LOG_FILE = "KU_academic_run.log"
+METRICS_FILE = "KU_academic_metrics.json"
+
+# --- EXPORTACION DE REPORTES ---
+# Formato -> (extension que reemplaza al '.csv' del nombre, compresion).
+# gzip nivel 6: casi el mismo tamaño que el 9 en la mitad del tiempo
+EXPORT_FORMATS = {'csv': ('.csv', None), 'csv.gz': ('.csv.gz', {'method': 'gzip', 'compresslevel': 6}),
+                  'parquet': ('.parquet', None)}
+# Huella de lo ultimo que se escribio en cada archivo (en la carpeta de salida)
+EXPORT_INDEX = ".KU_academic_exports.json"
+
+def write_atomic(path, write):
+    # write(tmp) escribe un archivo temporal en la misma carpeta y despues se
+    # cambia por el nombre final de una vez: nadie ve un archivo a medias
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def frame_hash(df):
+    # Huella del contenido (columnas, tipos y valores) sin escribir el archivo.
+    # None si no se puede calcular (ej. columnas con tipos mezclados)
+    try:
+        rows = pd.util.hash_pandas_object(df, index=False).values
+    except TypeError:
+        return None
+    digest = hashlib.blake2b(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode(),
+                             digest_size=20)
+    digest.update(rows.tobytes())
+    return digest.hexdigest()
+
+def export_path(folder, filename, fmt):
+    base = filename[:-4] if filename.endswith('.csv') else filename
+    return os.path.join(folder, base + EXPORT_FORMATS[fmt][0])
+
+def export_frame(df, path, fmt):
+    if fmt == 'parquet':
+        write_atomic(path, lambda tmp: df.to_parquet(tmp, index=False))
+    else:
+        write_atomic(path, lambda tmp: df.to_csv(tmp, index=False, compression=EXPORT_FORMATS[fmt][1]))
+
+def export_log_lines(result):
+    # Lo que hizo ReportExporter con un reporte, para el log
+    lines = []
+    if result['written']:
+        lines.append(f"Exported {', '.join(result['written'])}")
+    if result['unchanged']:
+        lines.append(f"Unchanged, not rewritten: {', '.join(result['unchanged'])}")
+    for error in result['errors']:
+        lines.append(f"Could not export {error}")
+    return lines
+
+class ReportExporter:
+    # Escribe los reportes en un hilo aparte mientras el proceso sigue.
+    # Cada archivo se escribe atomico y se salta si el contenido es el mismo
+    # de la ultima vez (y nadie toco el archivo desde entonces)
+    def __init__(self, folder='.', formats=('csv',)):
+        for fmt in formats:
+            if fmt not in EXPORT_FORMATS:
+                raise ValueError(f"Unknown export format: {fmt}")
+            if fmt == 'parquet' and not HAS_PYARROW:
+                raise ValueError("Parquet export needs pyarrow")
+        self.folder = folder
+        self.formats = list(formats)
+        self.index_path = os.path.join(folder, EXPORT_INDEX)
+        self.pool = None
+        self.pending = []
+
+    def submit(self, df, filename):
+        # El DataFrame no se copia: no hay que modificarlo despues
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ku-export")
+        self.pending.append(self.pool.submit(self.export, df, filename))
+
+    def wait(self):
+        # Espera todo lo pendiente y devuelve un resultado por reporte
+        results = [future.result() for future in self.pending]
+        self.pending = []
+        return results
+
+    def close(self):
+        self.wait()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def load_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self, index):
+        def write(tmp):
+            with open(tmp, "w") as f:
+                json.dump(index, f, indent=2)
+        write_atomic(self.index_path, write)
+
+    def unchanged(self, entry, path, digest):
+        if entry is None or digest is None or entry['hash'] != digest:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']
+
+    def export(self, df, filename):
+        # Corre en el hilo de exportacion (uno solo, asi el indice no se pisa)
+        start = time.perf_counter()
+        result = {'file': filename, 'rows': len(df), 'written': [], 'unchanged': [], 'errors': []}
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            index = self.load_index()
+            digest = frame_hash(df)
+            for fmt in self.formats:
+                path = export_path(self.folder, filename, fmt)
+                name = os.path.basename(path)
+                if self.unchanged(index.get(name), path, digest):
+                    result['unchanged'].append(name)
+                    continue
+                try:
+                    export_frame(df, path, fmt)
+                except Exception as e:
+                    result['errors'].append(f"{name}: {e}")
+                    continue
+                stat = os.stat(path)
+                index[name] = {'hash': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+                result['written'].append(name)
+            self.save_index(index)
+        except OSError as e:
+            result['errors'].append(f"{filename}: {e}")
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+# --- METRICAS POR ETAPA ---
+def count_text(n):
+    return "-" if n is None else f"{n:,}"
+
+class StageMetrics:
+    # Mide cada etapa del proceso: tiempo, filas que entran y salen y memoria
+    # maxima (con tracemalloc). Con enabled=False stage() no mide nada
+    def __init__(self, enabled=True, memory=True):
+        self.enabled = enabled
+        self.memory = memory
+        self.stages = {}
+        self.own_tracing = False
+        # add() puede correr en otro hilo (trabajo de la GUI, exportacion)
+        # mientras la pantalla de logs llama a report()
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            self.stages = {}
+        if self.enabled and self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.own_tracing = True
+
+    def stop(self):
+        if self.own_tracing:
+            tracemalloc.stop()
+            self.own_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        # Uso: with metrics.stage('validate', len(df)) as m: ... m['rows_out'] = n
+        record = {'rows_out': None}
+        if not self.enabled:
+            yield record
+            return
+
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if tracing:
+                peak = max(0, tracemalloc.get_traced_memory()[1] - before) / 1024 ** 2
+            self.add(name, seconds, rows_in, record['rows_out'], peak)
+
+    def add(self, name, seconds, rows_in=None, rows_out=None, peak_mb=None):
+        # En modo streaming la misma etapa corre una vez por bloque, se suman
+        with self.lock:
+            s = self.stages.setdefault(name, {'stage': name, 'calls': 0, 'seconds': 0.0,
+                                              'rows_in': None, 'rows_out': None, 'peak_mb': None})
+            s['calls'] += 1
+            s['seconds'] += seconds
+            if rows_in is not None:
+                s['rows_in'] = (s['rows_in'] or 0) + rows_in
+            if rows_out is not None:
+                s['rows_out'] = (s['rows_out'] or 0) + rows_out
+            if peak_mb is not None:
+                s['peak_mb'] = max(s['peak_mb'] or 0, peak_mb)
+
+    def report(self):
+        # Copia bajo el lock: las etapas pueden cambiar mientras se lee
+        with self.lock:
+            snapshot = [dict(s) for s in self.stages.values()]
+        stages = []
+        for s in snapshot:
+            s = dict(s, seconds=round(s['seconds'], 4))
+            if s['peak_mb'] is not None:
+                s['peak_mb'] = round(s['peak_mb'], 1)
+            stages.append(s)
+        return stages
+
+    def summary_lines(self):
+        # Una linea por etapa para mostrar en la pantalla de logs
+        lines = []
+        for s in self.report():
+            rows = ""
+            if s['rows_in'] is not None or s['rows_out'] is not None:
+                rows = f"  rows {count_text(s['rows_in'])} -> {count_text(s['rows_out'])}"
+            memory = f"  peak {s['peak_mb']:.1f} MB" if s['peak_mb'] is not None else ""
+            lines.append(f"{s['stage']:<18}{s['seconds']:>9.3f}s{rows}{memory}")
+        return lines
+
+    def write(self, path, **info):
+        def write(tmp):
+            with open(tmp, "w") as f:
+                json.dump(dict(info, stages=self.report()), f, indent=2)
+        write_atomic(path, write)
+
+# --- LOG DE CADA CORRIDA ---
+LOG_BUFFER_LINES = 10000   # Lineas que se guardan en memoria (las mas nuevas)
+
+class RunLog:
+    # Guarda las ultimas lineas en memoria (buffer circular) y un hilo aparte
+    # las va escribiendo al archivo, asi loguear no frena el proceso
+    def __init__(self, maxlen=LOG_BUFFER_LINES, echo=True):
+        self.maxlen = maxlen
+        self.echo = echo
+        self.lines = deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+        self.queue = None
+        self.writer = None
+        self.second = None
+        self.stamp = ""
+
+    def start(self, path=None):
+        # Empieza una corrida nueva. Con path=None solo se guarda en memoria
+        self.close()
+        with self.lock:
+            self.lines = deque(maxlen=self.maxlen)
+        if path is not None:
+            self.queue = queue.Queue()
+            self.writer = threading.Thread(target=self.write_loop, args=(path, self.queue), daemon=True)
+            self.writer.start()
+
+    def now(self):
+        # strftime solo una vez por segundo
+        second = int(time.time())
+        if second != self.second:
+            self.second = second
+            self.stamp = datetime.datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+        return self.stamp
+
+    def add(self, message):
+        entry = f"[{self.now()}] {message}"
+        if self.echo:
+            print(entry) # Imprimir en consola tambien por si acaso
+        with self.lock:
+            self.lines.append(entry)
+        if self.queue is not None:
+            self.queue.put(entry + "\n")
+
+    def extend(self, entries):
+        # Lineas que ya traen la hora (ej. el log de otro proceso)
+        if self.echo:
+            for entry in entries:
+                print(entry)
+        with self.lock:
+            self.lines.extend(entries)
+        if self.queue is not None and entries:
+            self.queue.put("".join(entry + "\n" for entry in entries))
+
+    def write_only(self, text):
+        # Texto que va solo al archivo (ej. el detalle de cada fila rechazada)
+        if self.queue is not None and text:
+            self.queue.put(text)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.lines)
+
+    def close(self):
+        # Espera a que el hilo termine de escribir todo
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join()
+        self.writer = None
+        self.queue = None
+
+    def write_loop(self, path, pending):
+        # Se escribe a un temporal que reemplaza al log anterior al cerrar,
+        # asi quien lee el log nunca ve uno a medias
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            f = open(tmp, "w")
+        except OSError:
+            print("Could not save log file")
+            f = None
+        done = False
+        while not done:
+            # Juntamos todo lo que haya en la cola y lo escribimos de una vez
+            parts = [pending.get()]
+            while not pending.empty():
+                parts.append(pending.get_nowait())
+            if None in parts:
+                parts = parts[:parts.index(None)]
+                done = True
+            if f is not None:
+                try:
+                    f.write("".join(parts))
+                    f.flush()
+                except OSError:
+                    print("Could not save log file")
+                    f.close()
+                    with contextlib.suppress(OSError):
+                        os.remove(tmp)
+                    f = None
+        if f is not None:
+            f.close()
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                print("Could not save log file")
+
+def read_log_page(path, offset=0, max_lines=1000):
+    # Lee hasta max_lines lineas desde 'offset' (en bytes).
+    # Devuelve (lineas, offset de la pagina siguiente o None si se acabo el archivo)
+    lines = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for _ in range(max_lines):
+            line = f.readline()
+            if not line:
+                return lines, None
+            lines.append(line.decode("utf-8", errors="replace").rstrip("\n"))
+        next_offset = f.tell()
+        return lines, (next_offset if f.readline() else None)
+
+# --- PROGRESO Y CANCELACION ---
+class JobCancelled(Exception):
+    # Se lanza entre etapas (o entre bloques) cuando alguien pidio cancelar
+    pass
+
+class Progress:
+    # Avisa como va una corrida (etapa, filas leidas, filas validas) y deja
+    # cancelarla. 'callback' recibe un dict por aviso y se llama desde el hilo
+    # que procesa: la GUI solo lo pone en una cola (ver JobRunner)
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.cancelled = threading.Event()
+        self.rows_parsed = 0
+        self.rows_valid = 0
+
+    def cancel(self):
+        # Se puede llamar desde otro hilo; se nota en el proximo update()
+        self.cancelled.set()
+
+    def update(self, stage, parsed=0, valid=0):
+        self.rows_parsed += parsed
+        self.rows_valid += valid
+        if self.callback is not None:
+            self.callback({'stage': stage, 'rows_parsed': self.rows_parsed,
+                           'rows_valid': self.rows_valid})
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+# --- ESTADO GUARDADO (para las corridas de cada noche) ---
+# Historia limpia y sumas por grupo, asi un archivo nuevo solo recalcula
+# los estudiantes y cursos que trae (ver UniversityLogic.save_state).
+# La historia se guarda en partes que no se reescriben; las sumas y los
+# reportes van con un numero de generacion que state.json dice cual vale
+STATE_TABLES = ['gpa_parts', 'course_parts', 'gpa_data', 'course_stats']
+STATE_INFO = "state.json"
+STATE_REWRITE_RATIO = 0.25   # Con mas de 25% de filas reemplazadas se reescribe todo
+
+def read_state_info(folder):
+    try:
+        with open(os.path.join(folder, STATE_INFO)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# --- MERGE DE VARIOS ARCHIVOS ---
+# Una inscripcion es unica por (student_id, term, course_id). Si llega dos
+# veces (reenvios, correcciones) gana el archivo mas nuevo ('latest') o el
+# primero que llego ('first')
+ENROLLMENT_KEY = ['student_id', 'term', 'course_id']
+MERGE_POLICIES = ('latest', 'first')
+
+def align_categories(frames):
+    # Las mismas categorias en todos (mismas columnas), asi el concat no las
+    # vuelve texto
+    dtypes = {}
+    for col in frames[0].columns:
+        found = [df[col].dtype for df in frames]
+        if all(isinstance(d, pd.CategoricalDtype) for d in found):
+            if all(d == found[0] for d in found):
+                continue
+            try:
+                categories = sorted(set().union(*(d.categories for d in found)))
+            except TypeError:
+                continue   # Numeros y texto mezclados: que lo resuelva el concat
+            dtypes[col] = pd.CategoricalDtype(categories, ordered=found[0].ordered)
+    if dtypes:
+        frames = [df.astype(dtypes) for df in frames]
+    return frames
+
+def key_matches(df, other):
+    # Mascara de las filas de df cuya inscripcion (ENROLLMENT_KEY) esta en
+    # 'other'. Primero un isin por student_id y solo esas filas se comparan
+    # con la llave completa, asi una historia grande no se recorre entera
+    mask = np.zeros(len(df), dtype=bool)
+    if df.empty or other.empty:
+        return mask
+    near = np.flatnonzero(df['student_id'].isin(other['student_id'].unique()).to_numpy())
+    if len(near):
+        mine = pd.MultiIndex.from_frame(plain_columns(df[ENROLLMENT_KEY].iloc[near].copy()))
+        theirs = pd.MultiIndex.from_frame(plain_columns(other[ENROLLMENT_KEY].copy()))
+        mask[near] = mine.isin(theirs)
+    return mask
+
+def append_rows(base, rows):
+    # Agrega filas a una historia ya compacta sin volver a compactarla toda:
+    # solo las filas nuevas se compactan, con los mismos tipos que la historia
+    rows = compact_frame(rows)
+    for col in base.columns:
+        dtype = base[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Los valores nuevos se agregan al final de las categorias (los
+            # codigos de la historia no cambian). Las ordenadas (grade) si
+            # tienen que quedar en orden, ahi se recodifica todo
+            values = pd.Index(rows[col].dropna().unique())
+            extra = values[~values.isin(dtype.categories)]
+            if len(extra) and dtype.ordered:
+                try:
+                    dtype = pd.CategoricalDtype(sorted(dtype.categories.union(extra)), ordered=True)
+                except TypeError:
+                    dtype = None
+                if dtype is not None:
+                    base = base.astype({col: dtype})
+            elif len(extra):
+                base = base.assign(**{col: base[col].cat.add_categories(extra)})
+                dtype = base[col].dtype
+            if dtype is not None:
+                rows[col] = rows[col].astype(dtype)
+        elif isinstance(rows[col].dtype, pd.CategoricalDtype):
+            rows[col] = rows[col].astype(rows[col].cat.categories.dtype)
+    return pd.concat([base, rows], ignore_index=True)
+
+def merge_enrollments(frames, policy='latest'):
+    # Junta los datos limpios de varios archivos (en orden, el ultimo es el
+    # mas nuevo) y deja una sola fila por inscripcion (ENROLLMENT_KEY).
+    # Devuelve (datos juntos, mascara de las filas que quedaron)
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy: {policy}")
+    # Las columnas opcionales que no traen todos los archivos quedarian vacias
+    # y los groupby perderian esas filas, asi que solo dejamos las comunes
+    columns = [c for c in frames[0].columns if all(c in df.columns for df in frames)]
+    frames = align_categories([df[columns] for df in frames])
+
+    # duplicated compara los valores de las llaves, no solo un hash
+    merged = pd.concat(frames, ignore_index=True)
+    keys = [c for c in ENROLLMENT_KEY if c in columns]
+    keep = ~merged.duplicated(subset=keys, keep='last' if policy == 'latest' else 'first')
+    merged = merged[keep.values].reset_index(drop=True)
+    return merged, keep.values
+
+def patch_parts(parts, report, part, part_report, level, values):
+    # Cambia en 'parts' y en su reporte (una fila por grupo, mismo orden) los
+    # grupos cuyo 'level' esta en 'values' por los recalculados. Quedan en el
+    # mismo orden que un groupby completo
+    keep = ~parts.index.get_level_values(level).isin(values)
+    parts = pd.concat([parts[keep], part])
+    report = pd.concat([report[keep], part_report], ignore_index=True)
+    order = parts.assign(_row=range(len(parts))).sort_index()['_row'].values
+    return parts.iloc[order], report.iloc[order].reset_index(drop=True)
+
+def clean_file(filepath):
+    # Lee y valida un archivo sin calcular reportes. Corre en otro proceso
+    # (ver UniversityLogic.merge_files)
+    logic = UniversityLogic(write_outputs=False)
+    logic.run_log.echo = False
+    logic.add_log(f"Reading: {filepath}")
+    try:
+        ok = logic.read_clean(filepath)
+    except Exception as e:
+        logic.add_log(f"Critical System Error: {e}")
+        ok = False
+    rows = len(logic.clean_data) + logic.rejections['row'].nunique()
+    return {'file': filepath, 'ok': ok, 'logs': logic.logs, 'rows': rows,
+            'clean': logic.clean_data, 'rejections': logic.rejections}
+
+def clean_files(files, workers=None):
+    # Da los resultados de clean_file en el mismo orden de 'files', cada uno
+    # apenas esta listo (asi se puede avisar el progreso archivo por archivo)
+    if workers == 1 or len(files) <= 1:
+        for f in files:
+            yield clean_file(f)
+        return
+    pool = ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(files)))
+    futures = [pool.submit(clean_file, f) for f in files]
+    done = False
+    try:
+        for future in futures:
+            yield future.result()
+        done = True
+    finally:
+        # Si se cancela a mitad (o falla un archivo) no se espera a los que
+        # quedan en cola: se descartan y los que ya corren terminan solos
+        pool.shutdown(wait=done, cancel_futures=True)
+
+# Esta clase maneja todos los datos y calculos
+class UniversityLogic:
+    def __init__(self, cache=None, write_outputs=True, metrics=None, memory_budget_mb=None,
+                 merge_policy='latest', store=None, progress=None, output_dir='.', export_formats=('csv',),
+                 log_file=None, interactive=True):
+        # cache: un ResultCache opcional para no reprocesar archivos iguales
+        # write_outputs=False no escribe los KU_academic_* (lo usa ku_batch.py)
+        # metrics: un StageMetrics para medir cada etapa (apagado por defecto)
+        # memory_budget_mb: limite de memoria opcional (ver enforce_budget)
+        # merge_policy: que inscripcion gana en merge_files ('latest' o 'first')
+        # store: un SQLiteStore opcional; las filas validas van a la base y no
+        # quedan en memoria (clean_data queda vacio)
+        # progress: un Progress para seguir la corrida y poder cancelarla
+        # output_dir y export_formats: donde y en que formatos ('csv', 'csv.gz',
+        # 'parquet') se escriben los reportes (ver ReportExporter)
+        # log_file: archivo para el log completo aunque write_outputs sea False
+        # (ku_batch junta el de cada archivo). Las lineas "Skipping Row" solo
+        # van al archivo, no a logs
+        # interactive=False no prepara graficos ni el indice de estudiantes
+        # (ku_batch no los usa)
+        if merge_policy not in MERGE_POLICIES:
+            raise ValueError(f"Unknown merge policy: {merge_policy}")
+        self.cache = cache
+        self.write_outputs = write_outputs
+        self.metrics = metrics if metrics is not None else StageMetrics(enabled=False)
+        self.memory_budget_mb = memory_budget_mb
+        self.merge_policy = merge_policy
+        self.store = store
+        self.progress = progress if progress is not None else Progress()
+        self.output_dir = output_dir
+        self.log_file = log_file
+        self.interactive = interactive
+        self.exporter = ReportExporter(output_dir, export_formats) if write_outputs else None
+        self.spill_path = None
+
+        # Archivos que forman clean_data (uno con load_file, varios con merge_files)
+        self.files = []
+
+        # Dataframes vacios al inicio para evitar errores
+        self.clean_data = pd.DataFrame()
+        self.gpa_data = pd.DataFrame()
+        self.course_stats = pd.DataFrame()
+        self.rejections = pd.DataFrame(columns=['row', 'column', 'reason'])
+        self.run_log = RunLog()
+        self.rejection_counts = {}
+
+        # Resultados parciales de los reportes (sumas por grupo), sirven para
+        # juntar varios archivos sin volver a procesarlos
+        self.gpa_parts = None
+        self.course_parts = None
+
+        # Posicion en el estado guardado de las primeras filas de clean_data
+        # (las demas todavia no se guardaron, ver save_state). None: no hay
+        self.saved_rows = None
+        self.state_folder = None
+
+        # Datos listos para los graficos (se borran al cargar otro archivo)
+        self.charts = {}
+        # Indice para buscar estudiantes (ver StudentIndex)
+        self.students = None
+
+    @property
+    def logs(self):
+        # Las ultimas lineas del log (el archivo tiene todo)
+        return self.run_log.snapshot()
+
+    def add_log(self, message):
+        # Funcion para guardar logs con la hora exacta
+        self.run_log.add(message)
+
+    def load_file(self, filepath, chunksize=None):
+        # chunksize=None lee todo el archivo en memoria (modo normal).
+        # Con un numero de filas se procesa por bloques (modo streaming)
+        self.charts = {}
+        self.students = None
+        self.rejection_counts = {}
+        self.saved_rows = None
+        self.drop_spill()
+        # Limpiar logs de la corrida anterior
+        self.run_log.start(self.run_log_path())
+        self.metrics.start()
+        start = time.perf_counter()
+        try:
+            ok = self.process_file(filepath, chunksize)
+            if ok:
+                self.prepare_views()
+                if self.memory_budget_mb:
+                    self.enforce_budget()
+        finally:
+            self.finish_exports()
+            self.metrics.stop()
+            self.run_log.close()
+        # En modo streaming no quedan filas, asi que no hay base para un merge
+        self.files = [filepath] if ok and (not self.clean_data.empty or self.spill_path) else []
+
+        if self.metrics.enabled and self.write_outputs:
+            try:
+                self.metrics.write(self.output_path(METRICS_FILE), file=filepath, ok=ok, chunksize=chunksize,
+                                   total_seconds=round(time.perf_counter() - start, 4))
+            except OSError:
+                print("Could not save metrics file")
+        return ok
+
+    def process_file(self, filepath, chunksize=None):
+        self.add_log(f"Starting process for: {filepath}")
+        
+        try:
+            # Detectar formato (CSV o JSON)
+            if not filepath.endswith(SUPPORTED_EXTENSIONS):
+                self.add_log("Error: File format not supported (Only .csv, .json, .jsonl or .ndjson)")
+                return False
+
+            # Si el archivo no entra en el limite de memoria, se lee por bloques
+            if not chunksize and self.memory_budget_mb:
+                chunksize = budget_chunksize(filepath, self.memory_budget_mb)
+                if chunksize:
+                    self.add_log(f"Memory budget {self.memory_budget_mb} MB: "
+                                 f"reading in blocks of {chunksize:,} rows")
+
+            if self.store is not None:
+                return self.load_file_sql(filepath, chunksize or SQL_CHUNK_ROWS)
+
+            if chunksize:
+                return self.load_file_streaming(filepath, chunksize)
+
+            if self.cache is not None and self.load_from_cache(filepath):
+                return True
+
+            if not self.read_clean(filepath):
+                return False
+            self.log_rejections(self.rejections)
+            self.log_rejection_summary()
+
+            if self.clean_data.empty:
+                self.add_log("Warning: No valid data found after cleaning.")
+                return False
+
+            # Si todo sale bien, calculamos los reportes
+            self.progress.update('reports')
+            self.calculate_gpa()
+            self.calculate_stats()
+
+            if self.cache is not None:
+                self.save_to_cache(filepath)
+            return True
+
+        except JobCancelled:
+            self.add_log("Cancelled by user")
+            return False
+        except Exception as e:
+            self.add_log(f"Critical System Error: {e}")
+            return False
+
+    def read_clean(self, filepath):
+        # Lee, normaliza y valida el archivo. Deja clean_data y rejections
+        with self.metrics.stage('parse') as m:
+            df = read_file(filepath)
+            m['rows_out'] = len(df)
+        self.progress.update('parse', parsed=len(df))
+
+        with self.metrics.stage('normalize_columns', len(df)) as m:
+            df = normalize_columns(df)
+            m['rows_out'] = len(df)
+
+        # Verificar columnas obligatorias
+        missing = missing_columns(df)
+        if len(missing) > 0:
+            self.add_log(f"CRITICAL ERROR: Missing columns {missing}")
+            return False
+
+        # --- VALIDACION (toda la columna a la vez) ---
+        # Creditos entre 1 y 5, notas solo A, B, C, D, F
+        # Cualquier otra letra como 'E' se considera error
+        with self.metrics.stage('validate', len(df)) as m:
+            self.clean_data, self.rejections = validate_rows(df)
+            m['rows_out'] = len(self.clean_data)
+        del df
+        self.progress.update('validate', valid=len(self.clean_data))
+
+        # Tipos compactos (categorias y enteros chicos) para clean_data
+        with self.metrics.stage('compact', len(self.clean_data)) as m:
+            self.clean_data = compact_frame(self.clean_data)
+            m['rows_out'] = len(self.clean_data)
+        return True
+
+    def merge_files(self, filepaths, workers=None):
+        # Modo merge: agrega varios archivos a los datos que ya estan cargados
+        # (en vez de reemplazarlos). Los archivos se leen en paralelo y los
+        # reportes se calculan una sola vez al final
+        self.charts = {}
+        self.students = None
+        self.rejection_counts = {}
+        base = self.restore_clean_data() if self.files else pd.DataFrame()
+        self.drop_spill()
+        self.run_log.start(self.run_log_path())
+        self.metrics.start()
+        start = time.perf_counter()
+        try:
+            ok = self.process_merge(filepaths, base, workers)
+            if ok:
+                self.prepare_views()
+                if self.memory_budget_mb:
+                    self.enforce_budget()
+        except JobCancelled:
+            self.add_log("Cancelled by user")
+            ok = False
+        finally:
+            self.finish_exports()
+            self.metrics.stop()
+            self.run_log.close()
+
+        if self.metrics.enabled and self.write_outputs:
+            try:
+                self.metrics.write(self.output_path(METRICS_FILE), files=self.files, ok=ok,
+                                   total_seconds=round(time.perf_counter() - start, 4))
+            except OSError:
+                print("Could not save metrics file")
+        return ok
+
+    def process_merge(self, filepaths, base, workers=None):
+        if self.store is not None:
+            self.add_log("Error: Merge mode is not available with the SQLite store")
+            return False
+        files = []
+        for filepath in filepaths:
+            if filepath.endswith(SUPPORTED_EXTENSIONS):
+                files.append(filepath)
+            else:
+                self.add_log(f"Error: File format not supported (Only .csv, .json, .jsonl or .ndjson): {filepath}")
+        self.add_log(f"Merging {len(files)} files into {len(self.files)} loaded "
+                     f"({self.merge_policy} file wins)")
+
+        with self.metrics.stage('parse_files') as m:
+            results = []
+            with contextlib.closing(clean_files(files, workers)) as parsed:
+                for r in parsed:
+                    results.append(r)
+                    self.progress.update('parse_files', parsed=r['rows'], valid=len(r['clean']))
+            m['rows_out'] = sum(len(r['clean']) for r in results)
+
+        frames = []
+        sources = []
+        rejections = []
+        for r in results:
+            self.run_log.extend(r['logs'])
+            if not r['ok']:
+                self.add_log(f"File not merged: {r['file']}")
+                continue
+            self.log_rejections(r['rejections'])
+            rejections.append(r['rejections'].assign(file=r['file']))
+            if not r['clean'].empty:
+                frames.append(r['clean'])
+                sources.append(r['file'])
+        # Ultimo punto para cancelar: despues se cambian los datos cargados
+        self.progress.update('merge')
+        self.log_rejection_summary()
+        if rejections:
+            self.rejections = pd.concat(rejections, ignore_index=True)
+
+        if base.empty and not frames:
+            self.add_log("Warning: No valid data found after cleaning.")
+            return False
+
+        # Si ya habia datos con sus reportes (y los archivos nuevos traen sus
+        # columnas), solo se agregan las filas nuevas y se recalculan los
+        # estudiantes y cursos que cambiaron
+        if (not base.empty and self.gpa_parts is not None and self.course_parts is not None
+                and all(c in df.columns for df in frames for c in base.columns)):
+            self.append_delta(base, frames, sources)
+            return True
+
+        files = (list(self.files) if not base.empty else []) + sources
+        if not base.empty:
+            frames.insert(0, base)
+            sources.insert(0, "loaded data")
+        with self.metrics.stage('merge', sum(len(df) for df in frames)) as m:
+            merged, keep = merge_enrollments(frames, self.merge_policy)
+            self.clean_data = compact_frame(merged)
+            self.saved_rows = None
+            m['rows_out'] = len(self.clean_data)
+        self.log_kept(sources, frames, keep)
+        self.files = files
+        self.add_log(f"Merged data: {len(self.clean_data):,} enrollments from {len(self.files)} files")
+
+        # Los reportes se calculan una sola vez con todo junto
+        self.calculate_gpa()
+        self.calculate_stats()
+        return True
+
+    def append_delta(self, base, frames, sources):
+        # Archivos nuevos sobre la historia ya cargada: solo se buscan las
+        # llaves de las filas nuevas en la historia, se sacan las filas que
+        # se reemplazan y se agregan (compactas) solo las nuevas
+        with self.metrics.stage('merge', sum(len(df) for df in frames)) as m:
+            if frames:
+                rows, keep = merge_enrollments([df[base.columns] for df in frames], self.merge_policy)
+                keep = keep.copy()
+            else:
+                rows, keep = base.iloc[0:0], np.zeros(0, dtype=bool)
+            found = key_matches(base, rows)
+            if self.merge_policy == 'latest':
+                replaced = found
+            else:
+                # Gana la historia: las filas nuevas con una llave que ya estaba no entran
+                old = key_matches(rows, base[found])
+                keep[np.flatnonzero(keep)[old]] = False
+                rows = rows[~old].reset_index(drop=True)
+                replaced = np.zeros(len(base), dtype=bool)
+            kept = base[~replaced] if replaced.any() else base
+            self.clean_data = append_rows(kept, rows) if len(rows) else kept.reset_index(drop=True)
+            if self.saved_rows is not None:
+                self.saved_rows = self.saved_rows[~replaced[:len(self.saved_rows)]]
+            m['rows_out'] = len(self.clean_data)
+
+        self.add_log(f"  loaded data: {len(kept):,} of {len(base):,} rows kept")
+        self.log_kept(sources, frames, keep)
+        self.files = self.files + sources
+        self.add_log(f"Merged data: {len(self.clean_data):,} enrollments from {len(self.files)} files")
+        changed = pd.concat([base[replaced], rows])
+        if changed.empty:
+            self.export_report(self.gpa_data, GPA_FILE)
+            self.export_report(self.course_stats, STATS_FILE)
+            return
+        self.update_reports(changed)
+
+    def log_kept(self, sources, frames, keep):
+        # Cuantas filas de cada archivo quedaron despues de sacar las repetidas
+        start = 0
+        for filepath, df in zip(sources, frames):
+            kept = int(keep[start:start + len(df)].sum())
+            self.add_log(f"  {filepath}: {kept:,} of {len(df):,} rows kept")
+            start += len(df)
+
+    def save_state(self, folder):
+        # Guarda la historia y las sumas por grupo en 'folder'. Si la historia
+        # salio de este mismo estado solo se escribe una parte con las filas
+        # nuevas y la lista de filas reemplazadas; state.json se cambia al
+        # final (atomico), asi una corrida cortada deja el estado anterior
+        self.restore_clean_data()
+        info = None
+        if self.saved_rows is not None and self.state_folder == os.path.abspath(folder):
+            info = read_state_info(folder)
+        if info is None or 'segments' not in info:
+            return self.write_state(folder)
+
+        total = sum(rows for _, rows in info['segments'])
+        gone = np.ones(total, dtype=bool)
+        gone[self.saved_rows] = False
+        deleted = np.flatnonzero(gone)
+        if len(deleted) > STATE_REWRITE_RATIO * total:
+            return self.write_state(folder)
+
+        generation = info['generation'] + 1
+        segments = info['segments']
+        new = self.clean_data.iloc[len(self.saved_rows):]
+        if len(new):
+            name = f"segment_{generation}"
+            write_table(new.reset_index(drop=True), os.path.join(folder, name))
+            segments = segments + [[name, len(new)]]
+        self.write_state_tables(folder, generation, deleted)
+        write_atomic(os.path.join(folder, STATE_INFO),
+                     lambda tmp: self.write_state_info(tmp, generation, segments))
+        for name in STATE_TABLES + ['deleted']:
+            remove_table(os.path.join(folder, f"{name}_{info['generation']}"))
+        self.saved_rows = np.append(self.saved_rows, np.arange(total, total + len(new)))
+
+    def write_state(self, folder):
+        # Estado completo desde cero: se escribe en una carpeta temporal y se
+        # cambia al final, como el cache
+        tmp = folder.rstrip(os.sep) + ".tmp"
+        old = folder.rstrip(os.sep) + ".old"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        write_table(self.clean_data, os.path.join(tmp, "segment_0"))
+        self.write_state_tables(tmp, 0, np.zeros(0, dtype='int64'))
+        self.write_state_info(os.path.join(tmp, STATE_INFO), 0, [["segment_0", len(self.clean_data)]])
+        if os.path.isdir(folder):
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(folder, old)
+        os.replace(tmp, folder)
+        shutil.rmtree(old, ignore_errors=True)
+        self.saved_rows = np.arange(len(self.clean_data))
+        self.state_folder = os.path.abspath(folder)
+
+    def write_state_tables(self, folder, generation, deleted):
+        write_table(pd.DataFrame({'row': deleted}), os.path.join(folder, f"deleted_{generation}"))
+        for name in STATE_TABLES:
+            write_table(getattr(self, name), os.path.join(folder, f"{name}_{generation}"))
+
+    def write_state_info(self, path, generation, segments):
+        with open(path, "w") as f:
+            json.dump({'version': CACHE_VERSION, 'files': self.files, 'merge_policy': self.merge_policy,
+                       'generation': generation, 'segments': segments}, f, indent=2)
+
+    def load_state(self, folder):
+        # Carga lo que guardo save_state. Devuelve False si no hay estado (o es
+        # de otra version) y no cambia nada
+        info = read_state_info(folder)
+        if info is None or info.get('version') != CACHE_VERSION:
+            return False
+        self.drop_spill()
+        if 'segments' not in info:
+            # Estado de antes de guardar por partes: la proxima vez se reescribe
+            self.clean_data = read_table(os.path.join(folder, 'clean_data'))
+            for name in STATE_TABLES:
+                setattr(self, name, read_table(os.path.join(folder, name)))
+            self.saved_rows = None
+        else:
+            generation = info['generation']
+            segments = [read_table(os.path.join(folder, name)) for name, _ in info['segments']]
+            clean = pd.concat(align_categories(segments), ignore_index=True)
+            deleted = read_table(os.path.join(folder, f"deleted_{generation}"))['row'].to_numpy()
+            if len(deleted):
+                clean = clean.drop(index=deleted).reset_index(drop=True)
+            self.clean_data = clean
+            for name in STATE_TABLES:
+                setattr(self, name, read_table(os.path.join(folder, f"{name}_{generation}")))
+            self.saved_rows = np.delete(np.arange(sum(rows for _, rows in info['segments'])), deleted)
+        self.state_folder = os.path.abspath(folder)
+        self.files = info['files']
+        self.prepare_views()
+        return True
+
+    def prepare_views(self):
+        # Graficos e indice de estudiantes (los usan la GUI y el servicio)
+        if not self.interactive:
+            return
+        self.charts = chart_data(self.gpa_data, self.course_stats)
+        self.build_student_index()
+
+    def build_student_index(self):
+        # Si el indice no se puede armar la carga sigue, sin busqueda de estudiantes
+        try:
+            with self.metrics.stage('student_index', len(self.gpa_data)) as m:
+                self.students = StudentIndex(self.gpa_parts)
+                m['rows_out'] = len(self.students.history)
+        except Exception as e:
+            self.students = None
+            self.add_log(f"Student search not available: {e}")
+
+    def update_reports(self, changed):
+        # Recalcula solo los grupos de los estudiantes y cursos que aparecen en
+        # 'changed' (filas nuevas o reemplazadas) y parcha gpa_data y course_stats.
+        # Da exactamente lo mismo que calculate_gpa + calculate_stats
+        students = changed['student_id'].unique()
+        courses = changed['course_id'].unique()
+        self.add_log(f"Updating {len(students):,} students and {len(courses):,} courses")
+
+        with self.metrics.stage('gpa_patch', len(changed)) as m:
+            rows = self.clean_data[self.clean_data['student_id'].isin(students)]
+            part = gpa_parts(rows, gpa_keys(rows.columns))
+            self.gpa_parts, self.gpa_data = patch_parts(self.gpa_parts, self.gpa_data, part,
+                                                        gpa_report(part), 'student_id', students)
+            m['rows_out'] = len(self.gpa_data)
+        self.export_report(self.gpa_data, GPA_FILE)
+
+        with self.metrics.stage('stats_patch', len(changed)) as m:
+            rows = self.clean_data[self.clean_data['course_id'].isin(courses)]
+            part = course_parts(rows, course_keys(rows.columns))
+            self.course_parts, self.course_stats = patch_parts(self.course_parts, self.course_stats, part,
+                                                               stats_report(part), 'course_id', courses)
+            m['rows_out'] = len(self.course_stats)
+        self.export_report(self.course_stats, STATS_FILE)
+
+    def read_clean_chunks(self, filepath, chunksize, add):
+        # Lee y valida el archivo por bloques y le pasa cada bloque limpio a
+        # add(clean). Devuelve False si faltan columnas
+        rejections = []
+        chunks = read_chunks(filepath, chunksize)
+        while True:
+            with self.metrics.stage('parse') as m:
+                chunk = next(chunks, None)
+                m['rows_out'] = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            self.progress.update('parse', parsed=len(chunk))
+
+            with self.metrics.stage('normalize_columns', len(chunk)) as m:
+                chunk = normalize_columns(chunk)
+                m['rows_out'] = len(chunk)
+
+            missing = missing_columns(chunk)
+            if len(missing) > 0:
+                self.add_log(f"CRITICAL ERROR: Missing columns {missing}")
+                return False
+
+            with self.metrics.stage('validate', len(chunk)) as m:
+                clean, rejected = validate_rows(chunk)
+                m['rows_out'] = len(clean)
+            self.log_rejections(rejected)
+            rejections.append(rejected)
+            self.progress.update('validate', valid=len(clean))
+
+            add(clean)
+
+        if rejections:
+            self.rejections = pd.concat(rejections, ignore_index=True)
+        self.clean_data = pd.DataFrame()
+        self.log_rejection_summary()
+        return True
+
+    def load_file_streaming(self, filepath, chunksize):
+        # Igual que load_file pero por bloques de 'chunksize' filas.
+        # Solo guardamos los acumuladores, no los datos limpios, asi la memoria
+        # no depende del tamaño del archivo
+        reports = RunningReports()
+
+        def add(clean):
+            with self.metrics.stage('aggregate', len(clean)):
+                reports.add(clean)
+
+        if not self.read_clean_chunks(filepath, chunksize, add):
+            return False
+        if reports.rows == 0:
+            self.add_log("Warning: No valid data found after cleaning.")
+            return False
+
+        with self.metrics.stage('combine'):
+            reports.combine()
+        self.gpa_parts = reports.gpa_parts
+        self.course_parts = reports.course_parts
+        with self.metrics.stage('gpa') as m:
+            self.gpa_data = reports.gpa_report()
+            m['rows_out'] = len(self.gpa_data)
+        self.export_report(self.gpa_data, GPA_FILE)
+        with self.metrics.stage('course_stats') as m:
+            self.course_stats = reports.stats_report()
+            m['rows_out'] = len(self.course_stats)
+        self.export_report(self.course_stats, STATS_FILE)
+        self.add_log(f"Streaming done: {reports.rows} valid rows")
+        return True
+
+    def load_file_sql(self, filepath, chunksize):
+        # Modo SQLite: cada bloque validado va a la base y los reportes se
+        # calculan con SQL (ver SQLiteStore)
+        def add(clean):
+            with self.metrics.stage('sql_insert', len(clean)) as m:
+                if self.store.rows == 0:
+                    self.store.start(clean.columns)
+                self.store.add(clean)
+                m['rows_out'] = len(clean)
+
+        self.store.rows = 0
+        if not self.read_clean_chunks(filepath, chunksize, add):
+            return False
+        if self.store.rows == 0:
+            self.add_log("Warning: No valid data found after cleaning.")
+            return False
+        with self.metrics.stage('sql_index', self.store.rows):
+            self.store.finish()
+        self.add_log(f"Stored {self.store.rows:,} valid rows in {self.store.path}")
+
+        self.progress.update('reports')
+        self.calculate_gpa()
+        self.calculate_stats()
+        return True
+
+    def load_from_cache(self, filepath):
+        # Si el archivo ya se proceso antes, cargamos todo del cache
+        try:
+            with self.metrics.stage('cache_load') as m:
+                tables = self.cache.get(filepath)
+                m['rows_out'] = 0 if tables is None else len(tables['clean_data'])
+        except Exception as e:
+            self.add_log(f"Cache not available: {e}")
+            return False
+        if tables is None or tables['clean_data'].empty:
+            return False
+
+        self.clean_data = tables['clean_data']
+        self.gpa_data = tables['gpa_data']
+        self.course_stats = tables['course_stats']
+        self.rejections = tables['rejections']
+        self.gpa_parts = tables['gpa_parts']
+        self.course_parts = tables['course_parts']
+        self.add_log("Loaded cleaned data from cache")
+        self.log_rejections(self.rejections)
+        self.log_rejection_summary()
+        self.export_report(self.gpa_data, GPA_FILE)
+        self.export_report(self.course_stats, STATS_FILE)
+        return True
+
+    def enforce_budget(self):
+        # Si clean_data (ya compacta) sigue pasando el limite, la mandamos a
+        # disco y solo quedan los reportes en memoria
+        size = frame_mb(self.clean_data)
+        if size <= self.memory_budget_mb:
+            return
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        self.spill_path = os.path.join(SPILL_DIR, f"clean_data_{os.getpid()}_{id(self)}")
+        write_table(self.clean_data, self.spill_path)
+        self.clean_data = pd.DataFrame()
+        self.add_log(f"Memory budget {self.memory_budget_mb} MB: clean data ({size:,.1f} MB) "
+                     f"moved to {self.spill_path}")
+
+    def restore_clean_data(self):
+        # Vuelve a cargar clean_data si se mando a disco
+        if self.spill_path is not None and self.clean_data.empty:
+            self.clean_data = read_table(self.spill_path)
+        return self.clean_data
+
+    def drop_spill(self):
+        if self.spill_path is not None:
+            remove_table(self.spill_path)
+            self.spill_path = None
+
+    def save_to_cache(self, filepath):
+        try:
+            self.cache.put(filepath, {name: getattr(self, name) for name in CACHE_TABLES})
+        except Exception as e:
+            # El cache es solo para ir mas rapido, si falla seguimos normal
+            self.add_log(f"Could not save cache: {e}")
+
+    def log_rejections(self, rejected):
+        # Cada fila saltada va al archivo de log (sin pasar por la memoria ni la
+        # consola) y se cuenta por motivo para el resumen
+        if rejected.empty:
+            return
+        prefix = f"[{self.run_log.now()}] Skipping Row "
+        lines = prefix + rejected['row'].astype(str) + ": " + rejected['reason'].astype(str) + "\n"
+        self.run_log.write_only("".join(lines.tolist()))
+
+        for reason, count in rejected['reason'].value_counts().items():
+            self.rejection_counts[reason] = self.rejection_counts.get(reason, 0) + int(count)
+
+    def log_rejection_summary(self):
+        # Resumen de filas saltadas por motivo, ej. "412,033 x Invalid grade: E"
+        total = sum(self.rejection_counts.values())
+        if total == 0:
+            return
+        self.add_log(f"Skipped {total:,} rows:")
+        ranked = sorted(self.rejection_counts.items(), key=lambda item: -item[1])
+        for reason, count in ranked:
+            self.add_log(f"  {count:,} \u00d7 {reason}")
+
+    def calculate_gpa(self):
+        # GPA por estudiante y termino con un solo groupby (ver gpa_parts).
+        # En modo SQLite el groupby lo hace la base
+        if self.store is not None:
+            with self.metrics.stage('gpa', self.store.rows) as m:
+                self.gpa_parts = self.store.gpa_parts(gpa_keys(self.store.columns))
+                self.gpa_data = gpa_report(self.gpa_parts)
+                self.store.save_report(GPA_TABLE, self.gpa_data)
+                m['rows_out'] = len(self.gpa_data)
+        else:
+            with self.metrics.stage('gpa', len(self.clean_data)) as m:
+                keys = gpa_keys(self.clean_data.columns)
+                self.gpa_parts = gpa_parts(self.clean_data, keys)
+                self.gpa_data = gpa_report(self.gpa_parts)
+                m['rows_out'] = len(self.gpa_data)
+        self.export_report(self.gpa_data, GPA_FILE)
+
+    def calculate_stats(self):
+        # Estadisticas por curso con un solo groupby (ver course_parts)
+        if self.store is not None:
+            with self.metrics.stage('course_stats', self.store.rows) as m:
+                self.course_parts = self.store.course_parts(course_keys(self.store.columns))
+                self.course_stats = stats_report(self.course_parts)
+                self.store.save_report(STATS_TABLE, self.course_stats)
+                m['rows_out'] = len(self.course_stats)
+        else:
+            with self.metrics.stage('course_stats', len(self.clean_data)) as m:
+                keys = course_keys(self.clean_data.columns)
+                self.course_parts = course_parts(self.clean_data, keys)
+                self.course_stats = stats_report(self.course_parts)
+                m['rows_out'] = len(self.course_stats)
+        self.export_report(self.course_stats, STATS_FILE)
+
+    def output_path(self, filename):
+        return os.path.join(self.output_dir, filename)
+
+    def run_log_path(self):
+        if self.log_file is not None:
+            return self.log_file
+        return self.output_path(LOG_FILE) if self.write_outputs else None
+
+    def export_report(self, df, filename):
+        # Solo encola el reporte: se escribe en otro hilo mientras seguimos
+        if self.exporter is not None:
+            self.exporter.submit(df, filename)
+
+    def finish_exports(self):
+        # Espera a que se terminen de escribir los reportes y lo deja en el log
+        if self.exporter is None:
+            return
+        for r in self.exporter.wait():
+            if self.metrics.enabled:
+                self.metrics.add('export', r['seconds'], r['rows'], r['rows'] if r['written'] else 0)
+            for line in export_log_lines(r):
+                self.add_log(line)
@@ -0,0 +1,301 @@
+# Copyright 2025 Roberto Canija
+# License: GPL-3.0-or-later
+
+# Modo servicio: carga los datos una vez con UniversityLogic y responde
+# consultas por HTTP (solo en la maquina local), sin volver a leer archivos:
+#
+#   python ku_service.py exports/2025SP.csv --port 8765
+#   python ku_service.py exports/2025SP.csv exports/2025SP_fix.csv --merge latest
+#
+#   GET  /health                         archivos cargados, filas, hora de carga
+#   GET  /students?offset=0&limit=100    reporte de GPA por paginas
+#   GET  /students?q=smi                 busqueda por id exacto o comienzo del nombre
+#   GET  /students/<id>                  GPA por periodo y acumulado de un estudiante
+#   GET  /courses?department=CS          estadisticas por curso (por paginas)
+#   GET  /courses/<course_id>            estadisticas de un curso
+#   GET  /departments                    pass rate por departamento
+#   POST /reload?file=exports/new.csv    carga otro archivo (se puede repetir file=)
+#
+# La recarga corre en un hilo y las consultas siguen con los datos viejos
+# hasta que termina; ahi se cambian todos de una vez. Con SIGHUP se vuelven
+# a cargar los mismos archivos. No importa tkinter ni matplotlib.
+
+import argparse
+import asyncio
+import datetime
+import json
+import signal
+import sys
+import urllib.parse
+
+import pandas as pd
+
+from ku_logic import UniversityLogic, MERGE_POLICIES
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEPARTMENT_COLUMNS = ['department', 'courses', 'enrollment_count', 'pass_rate', 'course_pass_rate']
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 422: "Unprocessable Entity", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+class BadRequest(Exception):
+    pass
+
+def department_rates(course_parts):
+    # Pass rate por departamento sobre todas las inscripciones (no el promedio
+    # de los cursos, que tambien va como course_pass_rate, igual al grafico)
+    if course_parts is None or 'department' not in course_parts.index.names:
+        return pd.DataFrame(columns=DEPARTMENT_COLUMNS)
+    groups = course_parts.groupby(level='department', observed=True)
+    report = groups[['enrollment_count', 'passes']].sum().reset_index()
+    report['courses'] = groups.size().values
+    report['pass_rate'] = (report['passes'] / report['enrollment_count']).round(2)
+    course_rates = course_parts['passes'] / course_parts['enrollment_count']
+    report['course_pass_rate'] = course_rates.groupby(level='department', observed=True).mean().round(2).values
+    report['department'] = report['department'].astype(str)
+    return report[DEPARTMENT_COLUMNS]
+
+def records(df):
+    # Filas como lista de dicts para JSON (NaN queda como null)
+    return json.loads(df.to_json(orient='records'))
+
+class Snapshot:
+    # Todo lo que usan las consultas, armado una vez por carga. No se modifica
+    # nunca: una recarga arma otro y cambia la referencia, asi una consulta
+    # que ya empezo termina con los mismos datos con que empezo
+    def __init__(self, logic, files):
+        self.files = list(files)
+        self.loaded_at = datetime.datetime.now().isoformat(timespec='seconds')
+        self.gpa_data = logic.gpa_data
+        self.course_stats = logic.course_stats
+        self.students = logic.students
+        self.departments = department_rates(logic.course_parts)
+        # Posiciones de cada curso en course_stats (un curso puede tener mas de
+        # una fila si cambia el nombre o el departamento)
+        self.courses = {str(k): v for k, v in
+                        self.course_stats.groupby('course_id', sort=False).indices.items()}
+
+    def health(self):
+        return {'files': self.files, 'loaded_at': self.loaded_at, 'gpa_rows': len(self.gpa_data),
+                'courses': len(self.course_stats), 'departments': len(self.departments)}
+
+def load_snapshot(files, merge_policy):
+    # Corre en un hilo aparte. Devuelve (Snapshot o None, ultimas lineas del log).
+    # Cada carga usa su propio UniversityLogic; los datos limpios no se guardan
+    logic = UniversityLogic(write_outputs=False, merge_policy=merge_policy)
+    if len(files) == 1:
+        ok = logic.load_file(files[0])
+    else:
+        ok = logic.merge_files(files, workers=1)
+    if not ok:
+        return None, logic.logs[-20:]
+    return Snapshot(logic, files), logic.logs[-20:]
+
+def reload_files(body):
+    # Lista de archivos del cuerpo de POST /reload: {"files": ["a.csv", ...]}
+    try:
+        data = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise BadRequest("Body must be JSON")
+    if not isinstance(data, dict):
+        raise BadRequest('Body must be a JSON object like {"files": [...]}')
+    files = data.get('files', [])
+    if not isinstance(files, list) or not all(isinstance(f, str) for f in files):
+        raise BadRequest("files must be a list of file names")
+    return files
+
+def page_args(params):
+    # offset y limit de la URL (limit no pasa de MAX_PAGE_SIZE)
+    try:
+        offset = int(params.get('offset', ['0'])[0])
+        limit = int(params.get('limit', [str(PAGE_SIZE)])[0])
+    except ValueError:
+        raise BadRequest("offset and limit must be integers")
+    if offset < 0 or limit < 1:
+        raise BadRequest("offset must be >= 0 and limit >= 1")
+    return offset, min(limit, MAX_PAGE_SIZE)
+
+def page(df, params):
+    offset, limit = page_args(params)
+    return {'total': len(df), 'offset': offset, 'limit': limit,
+            'rows': records(df.iloc[offset:offset + limit])}
+
+class QueryService:
+    # Servidor HTTP minimo sobre asyncio. Las consultas son busquedas binarias
+    # o cortes de tablas ya calculadas, asi que se responden en el mismo loop;
+    # solo la carga de archivos va a un hilo
+    def __init__(self, files, merge_policy='latest'):
+        self.files = list(files)
+        self.merge_policy = merge_policy
+        self.snapshot = None
+        self.loading = False
+        self.loads = 0
+
+    async def load(self, files):
+        # Devuelve (status, payload). Si falla, quedan los datos anteriores
+        if self.loading:
+            return 409, {'error': "A reload is already running"}
+        self.loading = True
+        try:
+            loop = asyncio.get_running_loop()
+            snapshot, logs = await loop.run_in_executor(None, load_snapshot, files, self.merge_policy)
+        finally:
+            self.loading = False
+        if snapshot is None:
+            return 422, {'error': "Could not load the files, keeping the previous data", 'logs': logs}
+        self.snapshot = snapshot
+        self.files = list(files)
+        self.loads += 1
+        return 200, self.health()
+
+    def health(self):
+        info = {'status': "ok" if self.snapshot is not None else "empty", 'loading': self.loading,
+                'loads': self.loads}
+        if self.snapshot is not None:
+            info.update(self.snapshot.health())
+        return info
+
+    async def dispatch(self, method, target, body):
+        url = urllib.parse.urlsplit(target)
+        params = urllib.parse.parse_qs(url.query)
+        path = [urllib.parse.unquote(p) for p in url.path.split('/') if p]
+
+        if path == ['reload']:
+            if method != 'POST':
+                return 405, {'error': "Use POST"}
+            files = params.get('file') or (reload_files(body) if body else self.files)
+            if not files:
+                raise BadRequest("No files to load")
+            return await self.load(files)
+        if method != 'GET':
+            return 405, {'error': "Use GET"}
+        if path == ['health']:
+            return 200, self.health()
+
+        # La misma version de los datos para toda la consulta
+        snapshot = self.snapshot
+        if snapshot is None:
+            return 503, {'error': "No data loaded yet"}
+
+        if (path[:1] == ['students'] and (len(path) == 2 or 'q' in params)
+                and snapshot.students is None):
+            return 503, {'error': "Student search is not available for this data"}
+        if path == ['students']:
+            if 'q' in params:
+                limit = page_args(params)[1]
+                return 200, {'rows': records(snapshot.students.search(params['q'][0], limit))}
+            return 200, page(snapshot.gpa_data, params)
+        if len(path) == 2 and path[0] == 'students':
+            students = snapshot.students
+            student_id = students.parse_id(path[1])
+            history = students.lookup(student_id)
+            if history.empty:
+                return 404, {'error': f"Student not found: {path[1]}"}
+            names = students.search(path[1])
+            names = names.loc[names['student_id'].astype(str) == str(student_id), 'student_name'].dropna()
+            terms = records(history)
+            return 200, {'student_id': terms[0]['student_id'], 'names': names.tolist(),
+                         'terms': [{k: v for k, v in t.items() if k != 'student_id'} for t in terms]}
+        if path == ['courses']:
+            stats = snapshot.course_stats
+            if 'department' in params and 'department' in stats.columns:
+                stats = stats[stats['department'] == params['department'][0]]
+            return 200, page(stats, params)
+        if len(path) == 2 and path[0] == 'courses':
+            rows = snapshot.courses.get(path[1])
+            if rows is None:
+                return 404, {'error': f"Course not found: {path[1]}"}
+            return 200, {'rows': records(snapshot.course_stats.iloc[rows])}
+        if path == ['departments']:
+            return 200, {'rows': records(snapshot.departments)}
+        return 404, {'error': f"Unknown path: {url.path}"}
+
+    async def handle(self, reader, writer):
+        # Una conexion puede traer varias consultas seguidas (keep-alive)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    await self.send(writer, 400, {'error': "Bad request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    await self.send(writer, 400, {'error': "Bad Content-Length"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except (BadRequest, ValueError) as e:
+                    status, payload = 400, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+
+                keep = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self.send(writer, status, payload, keep)
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, status, payload, keep):
+        data = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n")
+        writer.write(head.encode() + data)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        status, info = await self.load(self.files)
+        if status != 200:
+            print("\n".join(info.get('logs', [])), file=sys.stderr)
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(self.load(self.files)))
+        except (NotImplementedError, AttributeError):
+            pass  # Windows no tiene SIGHUP
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving {info['gpa_rows']:,} GPA rows and {info['courses']:,} courses "
+              f"on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve KU GPA and course statistics over local HTTP.")
+    parser.add_argument("inputs", nargs="+", help="CSV/JSON/NDJSON files (more than one are merged)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--merge", choices=MERGE_POLICIES, default='latest',
+                        help="which file wins when several files repeat an enrollment")
+    args = parser.parse_args(argv)
+
+    service = QueryService(args.inputs, args.merge)
+    try:
+        ok = asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        return 0
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# Copyright 2025 Roberto Canija
+# License: GPL-3.0-or-later
+
+# Modo merge: una sola fila por inscripcion (student_id, term, course_id)
+# segun la politica, y agregar archivos de a uno (o con el estado guardado)
+# tiene que dar lo mismo que juntarlos todos de una vez.
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ku_logic
+from ku_logic import UniversityLogic
+
+HEADER = "term,student_id,student_name,major,course_id,department,credits,grade\n"
+
+# Historia, un periodo nuevo y una correccion de notas ya cargadas
+FILE_A = HEADER + """2024FA,1,Ann,Nursing,C1,NUR,3,A
+2024FA,1,Ann,Nursing,C2,BIO,4,B
+2024FA,2,Bob,Business,C1,NUR,3,C
+2024FA,3,Cy,Biology,C3,BIO,2,F
+2025SP,1,Ann,Nursing,C3,BIO,3,B
+"""
+FILE_B = HEADER + """2025SP,2,Bob,Business,C2,BIO,4,A
+2025SP,3,Cy,Biology,C1,NUR,3,B
+2025SP,4,Dee,Nursing,C4,NUR,5,D
+2025SP,4,Dee,Nursing,C4,NUR,5,C
+"""
+FILE_C = HEADER + """2024FA,1,Ann,Nursing,C2,BIO,4,A
+2024FA,3,Cy,Biology,C3,BIO,2,D
+2025SP,4,Dee,Nursing,C4,NUR,5,B
+2025SU,5,Eve,Business,C2,BIO,1,A
+"""
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name, rows in [('a', FILE_A), ('b', FILE_B), ('c', FILE_C)]:
+        path = tmp_path / f"{name}.csv"
+        path.write_text(rows)
+        paths.append(str(path))
+    return paths
+
+def merged(files, policy):
+    logic = UniversityLogic(write_outputs=False, merge_policy=policy)
+    assert logic.merge_files(files, workers=1)
+    return logic
+
+def grades(logic):
+    # Nota de cada inscripcion como texto, para comparar facil
+    data = logic.clean_data
+    return {(int(s), str(t), str(c)): str(g) for s, t, c, g in
+            zip(data['student_id'], data['term'], data['course_id'], data['grade'])}
+
+def assert_same_data(logic, full):
+    assert logic.files == full.files
+    pd.testing.assert_frame_equal(logic.clean_data.astype(object), full.clean_data.astype(object))
+    pd.testing.assert_frame_equal(logic.gpa_data, full.gpa_data)
+    pd.testing.assert_frame_equal(logic.course_stats, full.course_stats)
+
+@pytest.mark.parametrize('policy', ['latest', 'first'])
+def test_duplicate_keys_keep_one_row(files, policy):
+    logic = merged(files, policy)
+    keys = logic.clean_data[['student_id', 'term', 'course_id']].astype(str)
+    assert not keys.duplicated().any()
+    assert len(logic.clean_data) == 9
+
+def test_latest_file_wins(files):
+    found = grades(merged(files, 'latest'))
+    assert found[(1, '2024FA', 'C2')] == 'A'      # Correccion de C
+    assert found[(3, '2024FA', 'C3')] == 'D'
+    assert found[(4, '2025SP', 'C4')] == 'B'      # Ultima de B y C (B tenia dos)
+
+def test_first_file_wins(files):
+    found = grades(merged(files, 'first'))
+    assert found[(1, '2024FA', 'C2')] == 'B'
+    assert found[(3, '2024FA', 'C3')] == 'F'
+    assert found[(4, '2025SP', 'C4')] == 'D'      # Primera de las dos de B
+
+def test_optional_columns_only_in_some_files_are_dropped(tmp_path, files):
+    plain = tmp_path / "plain.csv"
+    plain.write_text("term,student_id,student_name,course_id,credits,grade\n2025SU,6,Fay,C1,3,A\n")
+    logic = merged([files[0], str(plain)], 'latest')
+    assert 'major' not in logic.clean_data.columns
+    assert 'department' not in logic.clean_data.columns
+    assert 'major' not in logic.gpa_data.columns
+    assert len(logic.clean_data) == 6
+
+@pytest.mark.parametrize('policy', ['latest', 'first'])
+def test_delta_merges_match_full_merge(files, policy):
+    logic = UniversityLogic(write_outputs=False, merge_policy=policy)
+    assert logic.load_file(files[0])
+    assert logic.merge_files([files[1]], workers=1)
+    assert logic.merge_files([files[2]], workers=1)
+    assert_same_data(logic, merged(files, policy))
+
+@pytest.mark.parametrize('policy', ['latest', 'first'])
+@pytest.mark.parametrize('rewrite_ratio', [1.0, 0.0])
+def test_saved_state_matches_full_merge(tmp_path, files, policy, rewrite_ratio, monkeypatch):
+    # Cada noche: cargar el estado, agregar un archivo y guardar. Con 1.0 solo
+    # se agregan partes nuevas a la historia; con 0.0 cualquier reemplazo
+    # reescribe todo
+    monkeypatch.setattr(ku_logic, 'STATE_REWRITE_RATIO', rewrite_ratio)
+    state = str(tmp_path / "state")
+    logic = UniversityLogic(write_outputs=False, merge_policy=policy)
+    assert logic.merge_files([files[0]], workers=1)
+    logic.save_state(state)
+    for path in files[1:]:
+        logic = UniversityLogic(write_outputs=False, merge_policy=policy)
+        assert logic.load_state(state)
+        assert logic.merge_files([path], workers=1)
+        logic.save_state(state)
+
+    logic = UniversityLogic(write_outputs=False, merge_policy=policy)
+    assert logic.load_state(state)
+    assert_same_data(logic, merged(files, policy))
+    if rewrite_ratio == 1.0:
+        assert len([f for f in os.listdir(state) if f.startswith('segment_')]) == 3
@@ -0,0 +1,75 @@
+# Copyright 2025 Roberto Canija
+# License: GPL-3.0-or-later
+
+# Cache entre corridas y exportacion de reportes (ResultCache, ReportExporter)
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ku_logic
+from ku_logic import UniversityLogic, ResultCache, ReportExporter, HAS_PYARROW
+
+ROWS = """term,student_id,student_name,course_id,credits,grade
+2024FA,1,Ann,C1,3,A
+2024FA,2,Bob,C1,4,B
+2025SP,1,Ann,C2,3,C
+"""
+
+def test_cache_version_bump_drops_old_entries(tmp_path, monkeypatch):
+    path = tmp_path / "a.csv"
+    path.write_text(ROWS)
+    cache = ResultCache(str(tmp_path / "cache"))
+    logic = UniversityLogic(cache=cache, write_outputs=False)
+    assert logic.load_file(str(path))
+    key = cache.file_key(str(path))
+    assert cache.get(str(path)) is not None
+
+    # Nuevas reglas de validacion: el archivo no cambio pero la entrada vieja no sirve
+    monkeypatch.setattr(ku_logic, 'CACHE_VERSION', ku_logic.CACHE_VERSION + 1)
+    assert cache.file_key(str(path)) != key
+    assert cache.get(str(path)) is None
+
+def export_once(folder, df, formats):
+    exporter = ReportExporter(str(folder), formats)
+    exporter.submit(df, "report.csv")
+    result = exporter.wait()[0]
+    exporter.close()
+    assert result['errors'] == []
+    return result
+
+def mtimes(folder):
+    return {f: os.stat(folder / f).st_mtime_ns for f in os.listdir(folder)
+            if f.startswith("report")}
+
+@pytest.mark.parametrize('formats', [('csv',), ('csv', 'csv.gz'),
+                                     pytest.param(('parquet',), marks=pytest.mark.skipif(
+                                         not HAS_PYARROW, reason="needs pyarrow"))])
+def test_export_skips_unchanged_reports(tmp_path, formats):
+    df = pd.DataFrame({'course_id': ['C1', 'C2'], 'pass_rate': [0.5, 1.0]})
+    names = sorted(os.path.basename(ku_logic.export_path(str(tmp_path), "report.csv", f)) for f in formats)
+    assert sorted(export_once(tmp_path, df, formats)['written']) == names
+    before = mtimes(tmp_path)
+
+    # Mismo contenido: no se reescribe nada
+    result = export_once(tmp_path, df.copy(), formats)
+    assert result['written'] == []
+    assert sorted(result['unchanged']) == names
+    assert mtimes(tmp_path) == before
+
+    # Una fila distinta: se escribe de nuevo
+    df.loc[1, 'pass_rate'] = 0.75
+    assert sorted(export_once(tmp_path, df, formats)['written']) == names
+    if 'csv' in formats:
+        assert pd.read_csv(tmp_path / "report.csv")['pass_rate'].tolist() == [0.5, 0.75]
+
+    # Alguien cambio el archivo a mano: aunque los datos sean los mismos se reescribe
+    path = tmp_path / names[0]
+    path.write_bytes(path.read_bytes() + b"x")
+    assert names[0] in export_once(tmp_path, df, formats)['written']
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".tmp")]
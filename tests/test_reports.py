@@ -0,0 +1,254 @@
+# Copyright 2025 Roberto Canija
+# License: GPL-3.0-or-later
+
+# Los reportes de ku_logic tienen que salir iguales a los de la version
+# original (validacion fila por fila con iterrows y un loop por grupo), que
+# esta copiada aqui abajo como referencia.
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ku_logic
+from ku_logic import UniversityLogic, SQLiteStore
+
+# --- VERSION ORIGINAL (referencia) ---
+POINTS = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
+
+def reference_columns(df):
+    df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
+    if 'academic_term' in df.columns:
+        df = df.rename(columns={'academic_term': 'term'})
+    elif 'period' in df.columns:
+        df = df.rename(columns={'period': 'term'})
+    if 'student_no' in df.columns:
+        df = df.rename(columns={'student_no': 'student_id'})
+    elif 'id' in df.columns:
+        df = df.rename(columns={'id': 'student_id'})
+    if 'course_code' in df.columns:
+        df = df.rename(columns={'course_code': 'course_id'})
+    if 'full_name' in df.columns:
+        df = df.rename(columns={'full_name': 'student_name'})
+    elif 'name' in df.columns:
+        df = df.rename(columns={'name': 'student_name'})
+    return df
+
+def reference_clean(df):
+    good_rows = []
+    for index, row in df.iterrows():
+        try:
+            c = float(row['credits'])
+            if c < 1 or c > 5:
+                raise ValueError(f"Credits out of range: {c}")
+            g = str(row['grade']).upper().strip()
+            if g not in ['A', 'B', 'C', 'D', 'F']:
+                raise ValueError(f"Invalid grade: {g}")
+            good_rows.append(row)
+        except Exception:
+            pass
+    return pd.DataFrame(good_rows)
+
+def reference_gpa(clean):
+    data = clean.copy()
+    data['points'] = data['grade'].str.upper().map(POINTS)
+    data['credits'] = data['credits'].astype(float)
+    data['quality_points'] = data['points'] * data['credits']
+    cols = ['student_id', 'term'] + [c for c in ['student_name', 'major', 'campus'] if c in data.columns]
+    results = []
+    for ids, group in data.groupby(cols):
+        total_qp = group['quality_points'].sum()
+        total_cr = group['credits'].sum()
+        row = dict(zip(cols, ids))
+        row['GPA'] = round(total_qp / total_cr if total_cr > 0 else 0.0, 2)
+        results.append(row)
+    return pd.DataFrame(results)
+
+def reference_stats(clean):
+    cols = ['course_id'] + [c for c in ['course_name', 'department'] if c in clean.columns]
+    stats = []
+    for ids, group in clean.groupby(cols):
+        count = len(group)
+        avg = group['grade'].str.upper().map(POINTS).mean()
+        if avg >= 3.5: letter = 'A'
+        elif avg >= 2.5: letter = 'B'
+        elif avg >= 1.5: letter = 'C'
+        elif avg >= 0.5: letter = 'D'
+        else: letter = 'F'
+        passed = group[group['grade'].str.upper().isin(['A', 'B', 'C', 'D'])]
+        grades = sorted(group['grade'].unique())
+        row = dict(zip(cols, ids if len(cols) > 1 else (ids[0] if isinstance(ids, tuple) else ids,)))
+        row['enrollment_count'] = count
+        row['avg_grade'] = letter
+        row['pass_rate'] = round(len(passed) / count, 2)
+        row['highest_grade'] = grades[0]
+        row['lowest_grade'] = grades[-1]
+        stats.append(row)
+    return pd.DataFrame(stats)
+
+def reference_reports(path):
+    df = pd.read_csv(path) if path.endswith('.csv') else pd.read_json(path)
+    clean = reference_clean(reference_columns(df))
+    return reference_gpa(clean), reference_stats(clean)
+
+# --- DATOS DE PRUEBA ---
+# Notas con mayusculas/minusculas y espacios, creditos vacios, fuera de rango
+# y no numericos, y encabezados con los alias que acepta el loader
+ALIAS_ROWS = """Academic Term,Student No,Full Name,Major,Campus,Course Code,Course Name,Department,Credits,Grade
+2024FA,101,Ana Diaz,Nursing,Tampa,NUR101,Intro Nursing,NUR,3,A
+2024FA,101,Ana Diaz,Nursing,Tampa,BIO110,Biology I,BIO,4,b
+2024FA,101,Ana Diaz,Nursing,Tampa,ENG101,Composition,ENG,3, C
+2025SP,101,Ana Diaz,Nursing,Tampa,NUR201,Adult Health,NUR,5,a
+2024FA,102,Luis Perez,Business,Online,BUS100,Business Basics,BUS,3,F
+2024FA,102,Luis Perez,Business,Online,ENG101,Composition,ENG,,B
+2024FA,102,Luis Perez,Business,Online,BIO110,Biology I,BIO,abc,A
+2024FA,102,Luis Perez,Business,Online,NUR101,Intro Nursing,NUR,6,B
+2024FA,102,Luis Perez,Business,Online,BUS200,Accounting,BUS,0,C
+2025SP,102,Luis Perez,Business,Online,BUS100,Business Basics,BUS,2,E
+2025SP,102,Luis Perez,Business,Online,ENG101,Composition,ENG,3,
+2025SP,103,Mia Chen,Biology,Miami,BIO110,Biology I,BIO,4,D
+2025SP,103,Mia Chen,Biology,Miami,BUS100,Business Basics,BUS,1,d
+2025SP,103,Mia Chen,Biology,Miami,NUR101,Intro Nursing,NUR,2.5,F
+"""
+
+# Sin course_name ni department (columnas opcionales) y con otros alias
+PLAIN_ROWS = """period,id,name,course_code,credits,grade
+2024SP,7,Sam Roe,CS101,3,A
+2024SP,7,Sam Roe,CS102,3,C
+2024SP,8,Kim Lee,CS101,4,b
+2024SU,8,Kim Lee,CS103,2,G+
+2024SU,8,Kim Lee,CS101,three,A
+2024SU,9,Ray Fox,CS102,5,f
+"""
+
+@pytest.fixture(params=['alias', 'plain'])
+def export_file(request, tmp_path):
+    path = tmp_path / f"{request.param}.csv"
+    path.write_text(ALIAS_ROWS if request.param == 'alias' else PLAIN_ROWS)
+    return str(path)
+
+@pytest.fixture
+def json_file(tmp_path):
+    path = tmp_path / "alias.json"
+    reference_columns(pd.read_csv(pd.io.common.StringIO(ALIAS_ROWS))).to_json(path, orient='records')
+    return str(path)
+
+@pytest.fixture
+def big_file(tmp_path):
+    # Unas miles de filas al azar (siempre las mismas), con notas y creditos invalidos
+    rng = np.random.default_rng(7)
+    n = 5000
+    ids = rng.integers(1, 800, n)
+    df = pd.DataFrame({
+        'term': rng.choice(['2024SP', '2024FA', '2025SP'], n),
+        'student_id': ids,
+        'student_name': [f"Student {i}" for i in ids],
+        'major': rng.choice(['Nursing', 'Business', 'Biology'], n),
+        'course_id': rng.choice([f"C{i:03d}" for i in range(60)], n),
+        'department': rng.choice(['NUR', 'BUS', 'BIO', 'CS'], n),
+        'credits': rng.choice(['1', '2', '3', '4', '5', '6', 'x', ''], n),
+        'grade': rng.choice(['A', 'b', ' C', 'D', 'f', 'E', 'a'], n),
+    })
+    path = tmp_path / "big.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+def assert_same(new, old):
+    # Mismos valores y mismas columnas; los tipos pueden cambiar (ej. str/object)
+    new = new.reset_index(drop=True)
+    old = old.reset_index(drop=True)
+    assert list(new.columns) == list(old.columns)
+    pd.testing.assert_frame_equal(new.astype(object), old.astype(object), check_dtype=False)
+
+# --- PRUEBAS ---
+@pytest.mark.parametrize('chunksize', [None, 1, 4])
+@pytest.mark.parametrize('sqlite', [False, True])
+def test_reports_match_original(export_file, chunksize, sqlite, tmp_path):
+    # Con SQLite los creditos quedan como texto en la base y las sumas
+    # dependen de que SQLite los convierta a numero
+    gpa, stats = reference_reports(export_file)
+    store = SQLiteStore(str(tmp_path / "x.db")) if sqlite else None
+    logic = UniversityLogic(write_outputs=False, store=store)
+    try:
+        assert logic.load_file(export_file, chunksize)
+        assert_same(logic.gpa_data, gpa)
+        assert_same(logic.course_stats, stats)
+    finally:
+        if store is not None:
+            store.close()
+
+def test_json_reports_match_original(json_file):
+    gpa, stats = reference_reports(json_file)
+    logic = UniversityLogic(write_outputs=False)
+    assert logic.load_file(json_file)
+    assert_same(logic.gpa_data, gpa)
+    assert_same(logic.course_stats, stats)
+
+def test_calculate_again_gives_same_reports(export_file):
+    # calculate_gpa/calculate_stats sobre clean_data ya cargada
+    gpa, stats = reference_reports(export_file)
+    logic = UniversityLogic(write_outputs=False)
+    assert logic.load_file(export_file)
+    logic.calculate_gpa()
+    logic.calculate_stats()
+    assert_same(logic.gpa_data, gpa)
+    assert_same(logic.course_stats, stats)
+
+def test_mixed_student_ids_load(tmp_path):
+    # student_id con numeros y texto en el mismo JSON: no se puede ordenar
+    # 1 contra "S2", pero la carga y la busqueda tienen que funcionar
+    path = tmp_path / "mixed.json"
+    pd.DataFrame({'term': ['2024FA', '2024FA', '2025SP'], 'student_id': [1, 'S2', 1],
+                  'student_name': ['Ann', 'Bob', 'Ann'], 'course_id': ['C1', 'C1', 'C2'],
+                  'credits': [3, 3, 4], 'grade': ['A', 'B', 'C']}).astype(object).to_json(path, orient='records')
+    logic = UniversityLogic(write_outputs=False)
+    assert logic.load_file(str(path))
+    assert len(logic.gpa_data) == 3
+    students = logic.students
+    assert len(students.lookup(students.parse_id('S2'))) == 1
+    assert len(students.lookup(students.parse_id('1'))) == 2
+    assert students.search('b')['student_id'].tolist() == ['S2']
+
+@pytest.mark.parametrize('chunksize', [37, 100, 999])
+def test_chunked_reports_match_in_memory(big_file, chunksize, monkeypatch):
+    # Con un limite chico se agrupa muchas veces y se usa todo el arbol
+    monkeypatch.setattr(ku_logic, 'PART_BUFFER_ROWS', 250)
+    full = UniversityLogic(write_outputs=False)
+    assert full.load_file(big_file)
+    chunked = UniversityLogic(write_outputs=False)
+    assert chunked.load_file(big_file, chunksize)
+    assert len(full.gpa_data) > 1000
+    assert_same(chunked.gpa_data, full.gpa_data)
+    assert_same(chunked.course_stats, full.course_stats)
+
+def test_blank_student_id_keeps_numeric_search(tmp_path):
+    # Un id vacio hace que pandas lea student_id como float (9.0, 10.0...)
+    path = tmp_path / "blank.csv"
+    path.write_text("term,student_id,student_name,course_id,credits,grade\n"
+                    "2024FA,9,Ann,C1,3,A\n2024FA,,Zed,C1,3,B\n"
+                    "2024FA,10,Bob,C2,3,B\n2025SP,100,Cy,C2,4,C\n")
+    logic = UniversityLogic(write_outputs=False)
+    assert logic.load_file(str(path))
+    students = logic.students
+    for text in ['9', '10', '100']:
+        history = students.lookup(students.parse_id(text))
+        assert history['student_id'].tolist() == [int(text)]
+        assert students.search(text)['student_id'].tolist() == [int(text)]
+    assert students.search('c')['student_name'].tolist() == ['Cy']
+
+def test_sqlite_reports_match_in_memory(big_file, tmp_path):
+    full = UniversityLogic(write_outputs=False)
+    assert full.load_file(big_file)
+    store = SQLiteStore(str(tmp_path / "big.db"))
+    try:
+        logic = UniversityLogic(write_outputs=False, store=store)
+        assert logic.load_file(big_file, 1000)
+        assert_same(logic.gpa_data, full.gpa_data)
+        assert_same(logic.course_stats, full.course_stats)
+    finally:
+        store.close()